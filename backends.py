@@ -0,0 +1,70 @@
+"""Integer kernels under the numeric tower, chosen once at import time. Rational and Polynomial keep their API on every
+backend; only the kernels below change:
+  flint   products and gcds in Z[x] on python-flint's fmpz_poly, integer gcds in math.gcd
+  stdlib  math.gcd and the pure-Python polynomial kernels of poly_utils
+  python  the original pure-Python Euclidean gcd, kept as the reference
+flint is used when installed, else stdlib; POTTS_BACKEND in the environment forces one of BACKENDS."""
+import math
+import os
+from typing import Callable, List, Optional
+
+BACKENDS = "flint", "stdlib", "python"
+DEFAULT_BACKENDS = "flint", "stdlib"  # in order of preference; python is only used when forced
+
+_INT_POLY = List[int]
+
+
+def python_gcd(a: int, b: int) -> int:
+    """Euclidean Algorithm"""
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def _flint():
+    import flint
+
+    def poly_mul(a: _INT_POLY, b: _INT_POLY) -> _INT_POLY:
+        return [int(x) for x in (flint.fmpz_poly(list(a)) * flint.fmpz_poly(list(b))).coeffs()] or [0]
+
+    def poly_gcd(a: _INT_POLY, b: _INT_POLY) -> _INT_POLY:
+        return [int(x) for x in flint.fmpz_poly(list(a)).gcd(flint.fmpz_poly(list(b))).coeffs()] or [0]
+
+    # the gcds of Rational are almost all small, where any wrapper around math.gcd costs more than flint saves
+    return math.gcd, poly_mul, poly_gcd
+
+
+def _stdlib():
+    return math.gcd, None, None
+
+
+def _python():
+    return python_gcd, None, None
+
+
+_LOADERS = {"flint": _flint, "stdlib": _stdlib, "python": _python}
+
+
+def _select() -> str:
+    forced = os.environ.get("POTTS_BACKEND")
+    if forced:
+        if forced not in BACKENDS:
+            raise ValueError(f"POTTS_BACKEND={forced} is not one of {', '.join(BACKENDS)}")
+        try:
+            globals()["gcd"], globals()["poly_mul"], globals()["poly_gcd"] = _LOADERS[forced]()
+        except ImportError as e:
+            raise ImportError(f"POTTS_BACKEND={forced} needs a package that is not installed: {e}") from e
+        return forced
+    for name in DEFAULT_BACKENDS:
+        try:
+            globals()["gcd"], globals()["poly_mul"], globals()["poly_gcd"] = _LOADERS[name]()
+        except ImportError:
+            continue
+        return name
+    raise ImportError("no default backend could be loaded")  # unreachable: stdlib needs nothing
+
+
+gcd: Callable[[int, int], int]  # gcd(a, b) >= 0 for b > 0
+poly_mul: Optional[Callable[[_INT_POLY, _INT_POLY], _INT_POLY]]  # product in Z[x], if the backend has one
+poly_gcd: Optional[Callable[[_INT_POLY, _INT_POLY], _INT_POLY]]  # gcd in Z[x] with positive lc, if the backend has one
+NAME = _select()
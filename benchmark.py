@@ -0,0 +1,208 @@
+"""Benchmarks on fixed, seeded inputs in three tiers: micro (numeric tower), meso (transition matrices) and macro (whole
+partial orderings). Results are JSON, and can be checked against a stored baseline run:
+
+    python benchmark.py --tier micro --out new.json --baseline old.json"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import backends
+
+SEED = 20240607
+TIERS = "micro", "meso", "macro"
+REPEATS = 5  # timed repeats per benchmark; the minimum is what gets compared
+MIN_REPEAT_TIME = 0.2  # seconds; calls per repeat are doubled until one repeat takes at least this long
+DEFAULT_TOLERANCE = 0.25  # slowdown of the minimum over the baseline flagged as a regression
+
+# name -> (tier, setup returning the call to time); setup itself isn't timed
+BENCHMARKS: Dict[str, Tuple[str, Callable[[], Callable[[], Any]]]] = {}
+
+
+def benchmark(tier: str) -> Callable:
+    def register(setup: Callable[[], Callable[[], Any]]) -> Callable[[], Callable[[], Any]]:
+        BENCHMARKS[setup.__name__] = tier, setup
+        return setup
+    return register
+
+
+def _rationals(rng: random.Random, count: int, bits: int) -> list:
+    from rational import Rational
+    return [Rational(rng.getrandbits(bits) - (1 << bits - 1), rng.getrandbits(bits) | 1) for _ in range(count)]
+
+
+def _poly(rng: random.Random, deg: int, bits: int):
+    from polynomial import Polynomial
+    c = [rng.getrandbits(bits) - (1 << bits - 1) for _ in range(deg)] + [1 + rng.getrandbits(bits)]
+    return Polynomial.from_ints(c, 1 + rng.getrandbits(bits))
+
+
+@benchmark("micro")
+def rational_add() -> Callable[[], Any]:
+    xs = _rationals(random.Random(SEED), 1000, 64)
+    return lambda: [x + y for x, y in zip(xs, xs[1:])]
+
+
+@benchmark("micro")
+def rational_mul() -> Callable[[], Any]:
+    xs = _rationals(random.Random(SEED), 1000, 64)
+    return lambda: [x * y for x, y in zip(xs, xs[1:])]
+
+
+@benchmark("micro")
+def gcd() -> Callable[[], Any]:
+    rng = random.Random(SEED)
+    pairs = [(rng.getrandbits(256), rng.getrandbits(256)) for _ in range(1000)]
+    return lambda: [backends.gcd(a, b) for a, b in pairs]
+
+
+@benchmark("micro")
+def poly_mul() -> Callable[[], Any]:
+    rng = random.Random(SEED)
+    f, g = _poly(rng, 40, 64), _poly(rng, 40, 64)
+    return lambda: f * g
+
+
+@benchmark("micro")
+def poly_divmod() -> Callable[[], Any]:
+    rng = random.Random(SEED)
+    f, g = _poly(rng, 80, 32), _poly(rng, 30, 32)
+    return lambda: divmod(f, g)
+
+
+@benchmark("micro")
+def yun_factorization() -> Callable[[], Any]:
+    from polynomial import Polynomial
+    rng = random.Random(SEED)
+    f = Polynomial.from_ints([-1, 1]) * Polynomial.from_ints([2, 1])
+    f = f * f * Polynomial.from_ints([-1, 1]) * _poly(rng, 20, 16)
+    return f.yun_factorization
+
+
+@benchmark("meso")
+def transition_matrix() -> Callable[[], Any]:
+    from matrix_utils import generate_transition_matrix
+    return lambda: generate_transition_matrix(5)
+
+
+@benchmark("meso")
+def mult_matrix_step() -> Callable[[], Any]:
+    from matrix_utils import generate_transition_matrix, mult_matrix
+    from re_sum import zero_REsum
+    A = generate_transition_matrix(4)
+    return lambda: mult_matrix(A, A, add_id=zero_REsum)
+
+
+@benchmark("meso")
+def sum_terms() -> Callable[[], Any]:
+    from copy import deepcopy as cp
+    from matrix_utils import generate_transition_matrix
+    from re_sum import RESum, zero_REsum
+    x = cp(zero_REsum)
+    max_terms, RESum.max_terms = RESum.max_terms, 1 << 30  # keep every distinct denominator as its own term
+    try:
+        for row in generate_transition_matrix(5):
+            for y in row:
+                x += y
+    finally:
+        RESum.max_terms = max_terms
+    return x.sum_terms
+
+
+def _ordering(n: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        from partial_ordering import get_max_partial_ordering
+        return lambda: get_max_partial_ordering(n)
+    setup.__name__ = f"partial_ordering_{n}"
+    return setup
+
+
+for _n in range(3, 7):
+    benchmark("macro")(_ordering(_n))
+
+
+def _time(f: Callable[[], Any], repeats: int, min_time: float) -> Dict[str, Any]:
+    """Seconds per call over repeats, with calls per repeat chosen so that each repeat takes at least min_time"""
+    number = 1
+    while 1:
+        t = time.perf_counter()
+        for _ in range(number):
+            f()
+        first = time.perf_counter() - t
+        if first >= min_time:
+            break
+        number *= 2
+    times = [first / number]
+    for _ in range(repeats - 1):
+        t = time.perf_counter()
+        for _ in range(number):
+            f()
+        times.append((time.perf_counter() - t) / number)
+    return {"min": min(times), "median": statistics.median(times), "number": number, "repeats": repeats}
+
+
+def run(tiers=TIERS, names: Optional[List[str]] = None, repeats: int = REPEATS,
+        min_time: float = MIN_REPEAT_TIME) -> Dict[str, Any]:
+    """Results of the selected benchmarks with the environment they ran in; anything they print is swallowed"""
+    results = {}
+    for name, (tier, setup) in BENCHMARKS.items():
+        if tier not in tiers or (names is not None and name not in names):
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            f = setup()
+            results[name] = {"tier": tier, **_time(f, repeats, min_time)}
+    return {
+        "meta": {
+            "python": platform.python_version(), "platform": platform.platform(), "backend": backends.NAME,
+            "seed": SEED, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[Tuple[str, float, float]]:
+    """(name, baseline min, new min) of every benchmark more than tolerance slower than in baseline"""
+    res = []
+    for name, new in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is not None and new["min"] > old["min"] * (1 + tolerance):
+            res.append((name, old["min"], new["min"]))
+    return res
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tier", choices=TIERS, action="append", help="tiers to run (default: all)")
+    parser.add_argument("--name", action="append", help="benchmarks to run (default: all in the tiers)")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--min-time", type=float, default=MIN_REPEAT_TIME)
+    parser.add_argument("--out", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run(args.tier or TIERS, args.name, args.repeats, args.min_time)
+    text = json.dumps(results, indent=4, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.3g}s -> {new:.3g}s ({new / old:.2f}x)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Checkpoints of a get_max_partial_ordering run: the iterated column u / den of A^k e_0, the relation r and k"""
+import marshal
+import os
+from typing import List, Optional
+
+from polynomial import Polynomial
+
+FORMAT_VERSION = 2  # version 1 predates q and always meant q = 3
+
+
+class Checkpoint:
+    """State after step `step` of the run for the q-color chain on n vertices"""
+    __slots__ = ["n", "step", "u", "den", "r", "q"]
+
+    def __init__(
+        self, n: int, step: int, u: List[Polynomial], den: Polynomial, r: List[List[bool]], q: int = 3
+    ) -> None:
+        self.n, self.step, self.u, self.den, self.r, self.q = n, step, u, den, r, q
+
+
+def save_checkpoint(path: str, state: Checkpoint) -> None:
+    """Atomically replace the checkpoint at path, so a crash mid-write leaves the previous one intact"""
+    data = marshal.dumps((
+        FORMAT_VERSION, state.n, state.q, state.step,
+        [(f.c, f.d) for f in state.u], (state.den.c, state.den.d),
+        bytes(x for row in state.r for x in row),
+    ))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    """The checkpoint at path, or None if there isn't one"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = marshal.load(f)
+    if data[0] == 1:
+        data = data[:2] + (3,) + data[2:]
+    elif data[0] != FORMAT_VERSION:
+        raise ValueError(f"checkpoint format {data[0]}, expected {FORMAT_VERSION}")
+    _, n, q, step, u, den, r = data
+    s = len(u)
+    return Checkpoint(
+        n, step, [Polynomial.from_ints(c, d) for c, d in u], Polynomial.from_ints(*den),
+        [[bool(x) for x in r[i * s:(i + 1) * s]] for i in range(s)], q,
+    )
@@ -1,43 +1,45 @@
-from typing import Any, Type
+"""Coercion along the numeric tower int < Rational < Polynomial < RationalFunc < RESum. Each type's module registers
+the one-step promotion into it, and every (source, target) pair gets a composed promotion function up front."""
+from typing import Any, Callable, Dict, Optional, Tuple, Type
 from copy import deepcopy as cp
 
+PROMOTION = Callable[[Any], Any]
 
-types = "int", "Rational", "Polynomial", "RationalFunc", "RESum"
-
-def cast_up(x: Any, target_type: Type, read_only: bool=False) -> Any:
-    from rational import Rational
-    from polynomial import Polynomial, one_poly
-    from rational_func import RationalFunc
-    from re_sum import RESum
-
-    if not read_only:
-        x = cp(x)
-
-    ptr = 0
-    this_type = type(x).__name__
-    target_type = target_type.__name__
-    print(this_type)
-    while ptr < 5 and this_type != types[ptr]:
-        ptr += 1
-    if ptr == 5:
-        raise TypeError(f"input to cast_up is of invalid type {this_type}")
-
-    while ptr < 5:
-        curr_type = types[ptr]
-        if type(x).__name__ != curr_type:
-            raise TypeError(f"{type(x)} does not match {curr_type}")
-        if target_type == curr_type:
-            return x
-        if curr_type == int:
-            x = Rational(x, 1)
-        elif curr_type == Rational:
-            x = Polynomial([x])
-        elif curr_type == Polynomial:
-            x = RationalFunc(x, cp(one_poly))
-        elif isinstance(x, RationalFunc):
-            x = RESum([x])
-        elif target_type == RESum:
-            raise TypeError(f"target type {target_type} is invalid")
-        ptr += 1
-
-    raise TypeError("what the cast_up doin")
+_steps: Dict[type, Tuple[type, PROMOTION]] = {}  # type -> (the type just above it, promotion into that type)
+_promotions: Dict[Tuple[type, type], PROMOTION] = {}  # (source, target) -> composed promotion, for target >= source
+
+
+def _identity(x: Any) -> Any:
+    return x
+
+
+def _compose(f: PROMOTION, g: PROMOTION) -> PROMOTION:
+    return g if f is _identity else lambda x: g(f(x))
+
+
+def register_promotion(source: type, target: type, f: PROMOTION) -> None:
+    """f promotes a source to the type just above it in the tower, target"""
+    _steps[source] = target, f
+    _promotions.clear()
+    for start in set(_steps) | {t for t, _ in _steps.values()}:
+        cur, g = start, _identity
+        _promotions[start, cur] = g
+        while cur in _steps:
+            cur, step = _steps[cur]
+            g = _compose(g, step)
+            _promotions[start, cur] = g
+
+
+def promotion(source: type, target_type: type) -> Optional[PROMOTION]:
+    """The function casting a source up to target_type, or None if target_type is below source or unrelated"""
+    return _promotions.get((source, target_type))
+
+
+def cast_up(x: Any, target_type: Type, read_only: bool = False) -> Any:
+    """x as a target_type; a copy unless read_only or promotion built a new object anyway"""
+    f = _promotions.get((type(x), target_type))
+    if f is None:
+        raise TypeError(f"can't cast {type(x).__name__} up to {target_type.__name__}")
+    if f is _identity:
+        return x if read_only else cp(x)
+    return f(x)
@@ -0,0 +1,166 @@
+"""Opt-in instrumentation of the hot paths, to tell degree growth, coefficient growth and term explosion apart:
+Rational constructions and gcd calls, degree and coefficient-size histograms of Polynomial products and divisions,
+RESum lengths, and wall time per phase of get_max_partial_ordering. enable() swaps counting wrappers in and disable()
+restores the originals, so while disabled the instrumented code runs untouched; phase() and timed() cost one check."""
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+enabled = False
+counts: Counter = Counter()  # event -> occurrences
+histograms: Dict[str, Counter] = defaultdict(Counter)  # quantity -> {value or bucket: occurrences}
+phase_times: Counter = Counter()  # phase -> seconds
+phase_calls: Counter = Counter()  # phase -> times entered
+
+_originals: List[Tuple[Any, str, Any]] = []  # (owner, attribute, original value) of every wrapper swapped in
+
+
+def _bits(c: Iterable[int]) -> int:
+    """Bit size of the largest coefficient, rounded up to a power of two to keep the histograms short"""
+    b = max((x.bit_length() for x in c), default=0)
+    return 1 << (b - 1).bit_length() if b > 1 else b
+
+
+def _record(name: str, *polys) -> None:
+    counts[name] += 1
+    histograms[name + "_degree"][max(len(f.c) for f in polys) - 1] += 1
+    histograms[name + "_bits"][max(_bits(f.c) for f in polys)] += 1
+
+
+def _patch(owner: Any, name: str, wrap: Callable[[Any], Any]) -> None:
+    original = vars(owner)[name]
+    _originals.append((owner, name, original))
+    setattr(owner, name, wrap(getattr(owner, name)))
+
+
+def _wrappers() -> None:
+    import rational
+    from polynomial import Polynomial
+    from re_sum import RESum
+
+    def rational_new(new):
+        def __new__(cls, _p, _q=1):
+            counts["rational_new"] += 1
+            return new(cls, _p, _q)
+        return __new__
+
+    def gcd(f):
+        def wrapper(a, b):
+            counts["gcd"] += 1
+            histograms["gcd_bits"][_bits((a, b))] += 1
+            return f(a, b)
+        return wrapper
+
+    active = []  # the Polynomial operation being recorded, if any; the ones it calls, e.g. // on divmod, aren't
+
+    def poly_op(name):
+        def wrap(f):
+            def wrapper(self, other):
+                if active:
+                    return f(self, other)
+                if isinstance(other, Polynomial):
+                    _record(name, self, other)
+                else:
+                    _record(name, self)
+                active.append(name)
+                try:
+                    return f(self, other)
+                finally:
+                    active.pop()
+            return wrapper
+        return wrap
+
+    def re_sum_simplify(f):
+        def simplify(self):
+            f(self)
+            histograms["re_sum_terms"][len(self.a)] += 1
+        return simplify
+
+    def sum_terms(f):
+        def wrapper(self):
+            with phase("sum_terms"):
+                return f(self)
+        return wrapper
+
+    _patch(rational.Rational, "__new__", rational_new)
+    _patch(rational, "gcd", gcd)
+    for attr in "__mul__", "__rmul__":
+        _patch(Polynomial, attr, poly_op("poly_mul"))
+    _patch(Polynomial, "__divmod__", poly_op("poly_divmod"))
+    _patch(Polynomial, "__floordiv__", poly_op("poly_floordiv"))
+    _patch(RESum, "simplify", re_sum_simplify)
+    _patch(RESum, "sum_terms", sum_terms)
+
+
+def enable() -> None:
+    global enabled
+    if not enabled:
+        _wrappers()
+        enabled = True
+
+
+def disable() -> None:
+    global enabled
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+    enabled = False
+
+
+def reset() -> None:
+    counts.clear()
+    histograms.clear()
+    phase_times.clear()
+    phase_calls.clear()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Adds the wall time of the block to phase_times[name]"""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_times[name] += time.perf_counter() - start
+        phase_calls[name] += 1
+
+
+def timed(iterable: Iterable, name: str) -> Iterator:
+    """iterable, with the time spent producing each item added to phase_times[name]"""
+    if not enabled:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while 1:
+        with phase(name):
+            try:
+                x = next(it)
+            except StopIteration:
+                return
+        yield x
+
+
+def report() -> Dict[str, Any]:
+    """Everything recorded since the last reset(), as plain JSON-serializable data"""
+    return {
+        "counts": dict(counts),
+        "histograms": {name: {str(k): v for k, v in sorted(h.items())} for name, h in histograms.items()},
+        "phases": {name: {"seconds": phase_times[name], "calls": phase_calls[name]} for name in phase_times},
+    }
+
+
+@contextmanager
+def instrumented() -> Iterator[Callable[[], Dict[str, Any]]]:
+    """Enables and resets instrumentation for the block, which gets report; restores the previous state afterwards"""
+    was_enabled = enabled
+    enable()
+    reset()
+    try:
+        yield report
+    finally:
+        if not was_enabled:
+            disable()
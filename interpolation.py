@@ -0,0 +1,123 @@
+"""Exact powers of the transition matrix by evaluation at rational points and Thiele rational interpolation"""
+from typing import List, Optional, Sequence
+
+import poly_utils
+from matrix_utils import generate_transition_matrix, evaluate_matrix_at_rational, iterate_power, denominator_lcm
+from polynomial import Polynomial, one_poly, zero_poly
+from rational import Rational, RAT_T, zero_rational, one_rational
+from rational_func import RationalFunc
+from re_sum import RESum
+
+
+class ThieleInterpolator:
+    """Thiele continued fraction a_0 + (x - x_0) / (a_1 + (x - x_1) / (a_2 + ...)), grown one point at a time"""
+    __slots__ = ["xs", "a"]
+
+    def __init__(self) -> None:
+        self.xs: List[Rational] = []
+        self.a: List[Rational] = []
+
+    def __call__(self, x: RAT_T) -> Optional[Rational]:
+        """Value at x, or None if x is a pole"""
+        if not self.a:
+            return None
+        if isinstance(x, int):
+            x = Rational(x, 1)
+        res = self.a[-1]
+        for x_k, a_k in zip(reversed(self.xs[:-1]), reversed(self.a[:-1])):
+            if res is None:
+                res = a_k  # (x - x_k) / \infty
+            elif res == 0:
+                if x == x_k:
+                    return None  # 0 / 0 at a node of the tail
+                res = None
+                continue
+            else:
+                res = a_k + (x - x_k) // res
+        return res
+
+    def add(self, x: Rational, y: Rational) -> bool:
+        """Append (x, y) as the next node; False if its inverse differences degenerate and it had to be skipped"""
+        phi = y
+        for x_k, a_k in zip(self.xs, self.a):
+            diff = phi - a_k
+            if diff == 0:
+                return False
+            phi = (x - x_k) // diff
+        self.xs.append(x)
+        self.a.append(phi)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.a)
+
+    def to_rational_func(self) -> RationalFunc:
+        """The continued fraction as P / Q in lowest terms, via the convergent recurrence"""
+        if not self.a:
+            return RationalFunc(zero_poly, one_poly)
+        p_prev, q_prev = one_poly, zero_poly
+        p, q = Polynomial([self.a[0]]), one_poly
+        for x_k, a_k in zip(self.xs, self.a[1:]):
+            step = Polynomial([-x_k, 1])
+            p, p_prev = p * a_k + step * p_prev, p
+            q, q_prev = q * a_k + step * q_prev, q
+        g = Polynomial.from_ints(poly_utils.poly_gcd(p.c, q.c))
+        p, q = p // g, q // g
+        lc = q[-1]
+        return RationalFunc(p * Rational(lc.q, lc.p), q * Rational(lc.q, lc.p))
+
+
+def denominator_degree(A: List[List[RESum]]) -> int:
+    """Degree of the lcm of every denominator appearing in A"""
+    return len(denominator_lcm(A)) - 1
+
+
+def power_columns_by_interpolation(
+    A: List[List[RESum]], k: int, columns: Optional[Sequence[int]] = None, verify: Optional[int] = None
+) -> List[List[RationalFunc]]:
+    """The columns of A^k listed in columns (all of them by default), as exact rational functions of λ.
+
+    Every entry of A^k is a probability, so it is bounded at infinity and has numerator degree at most its
+    denominator degree, which is at most k * deg(lcm of the row denominators) = D. Agreeing at 2D + 1 points
+    therefore pins it down. With verify set, an entry also stops early once its interpolant has predicted that many
+    consecutive new points exactly. A is evaluated once per point, however many columns are asked for."""
+    s = len(A)
+    columns = range(s) if columns is None else columns
+    nodes = 2 * k * denominator_degree(A) + 1
+    interpolators = [[ThieleInterpolator() for _ in range(s)] for _ in columns]
+    streaks = [[0] * s for _ in columns]
+    done = [[False] * s for _ in columns]
+    lambd = 1
+    while not all(map(all, done)):
+        lambd += 1
+        x = Rational(lambd, 1)
+        A_x = evaluate_matrix_at_rational(A, x)
+        for c, column in enumerate(columns):
+            if all(done[c]):
+                continue
+            e = [one_rational if i == column else zero_rational for i in range(s)]
+            *_, v = iterate_power(A_x, e, k, add_id=zero_rational)
+            for i, y in enumerate(v):
+                if done[c][i]:
+                    continue
+                f = interpolators[c][i]
+                if f(x) == y:
+                    streaks[c][i] += 1
+                else:
+                    streaks[c][i] = 0
+                    f.add(x, y)
+                # the interpolant has type at most (D, D), so matching 2D + 1 points makes it exact
+                done[c][i] = len(f) + streaks[c][i] >= nodes or (verify is not None and streaks[c][i] >= verify)
+    return [[f.to_rational_func() for f in col] for col in interpolators]
+
+
+def power_column_by_interpolation(
+    n: int, k: int, column: int = 0, verify: Optional[int] = None, q: int = 3
+) -> List[RationalFunc]:
+    """Column `column` of A^k for the q-color chain on n vertices, indexed like StateSpace(n, q)"""
+    return power_columns_by_interpolation(generate_transition_matrix(n, q), k, [column], verify)[0]
+
+
+def power_by_interpolation(n: int, k: int, verify: Optional[int] = None, q: int = 3) -> List[List[RationalFunc]]:
+    """All of A^k for the q-color chain on n vertices, as rows"""
+    return [list(row) for row in zip(*power_columns_by_interpolation(generate_transition_matrix(n, q), k, None, verify))]
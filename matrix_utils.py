@@ -1,58 +1,156 @@
-from typing import List, TypeVar, Optional, Callable
+from typing import Dict, Iterable, Iterator, List, Tuple, TypeVar, Optional, Callable
 from polynomial import Polynomial
+from poly_matrix import PolyMatrix
+from sparse_matrix import SparseMatrix
+import poly_utils
 
 from re_sum import *
-from states import get_states
+from states import StateSpace
 
 
-def generate_transition_matrix(n: int) -> List[List[RESum]]:
-    states = get_states(n)
-    s = len(states)
+def transition_row(space: StateSpace, idx_x: int) -> Iterator[Tuple[int, Polynomial, Polynomial]]:
+    """(idx_y, f, tot) for every move out of state idx_x, with probability f / tot: a vertex of color src moves to
+    color dst with weight \\lambda^(vertices of color dst it would join); tot only depends on src"""
+    x = space.unrank(idx_x)
+    for src in range(space.q):
+        if not x[src]:
+            continue
+        exps = [cnt - (dst == src) for dst, cnt in enumerate(x)]
+        tot = zero_poly
+        for e in exps:
+            tot += Polynomial.monomial(e)
+        for dst, e in enumerate(exps):
+            y = [cnt - (i == src) + (i == dst) for i, cnt in enumerate(x)]
+            idx_y = space.rank((y[0], *sorted(y[1:], reverse=True)))
+            yield idx_y, Polynomial.monomial(e) * Rational(x[src], space.n), tot
+
+
+def _transitions(n: int, q: int = 3) -> Iterator[Tuple[int, int, Polynomial, Polynomial]]:
+    """(idx_x, idx_y, f, tot) for every move x -> y, generated row by row"""
+    space = StateSpace(n, q)
+    for idx_x in range(len(space)):
+        for idx_y, f, tot in transition_row(space, idx_x):
+            yield idx_x, idx_y, f, tot
+
+
+def generate_transition_matrix(n: int, q: int = 3) -> List[List[RESum]]:
+    s = len(StateSpace(n, q))
     A = [[cp(zero_REsum) for _ in range(s)] for _ in range(s)]
-    for idx_x, x in enumerate(states):
-        for src in range(3):
-            if not x[src]:
-                continue
-            tot = cp(zero_poly)
-            for dst in range(3):
-                n_c = x[dst] - (src == dst)
-                tot += Polynomial.monomial(n_c)
-            # mult_poly_scalar(tot, [n, n_c])
-            # print(f"tot: {fmt_polynomial(tot)}, state: {x}")
-            for dst in range(3):
-                n_c = x[dst] - (src == dst)
-                y = tuple(cnt - (i == src) + (i == dst) for i, cnt in enumerate(x))
-                y = y[0], max(y[1], y[2]), min(y[1], y[2])
-                # print(f"dst: {dst}, y: {y}")
-                idx_y = states.index(y)
-                A[idx_x][idx_y] += RationalFunc(Polynomial.monomial(n_c) * Rational(x[src], n), cp(tot))
+    for idx_x, idx_y, f, tot in _transitions(n, q):
+        A[idx_x][idx_y] += RationalFunc(f, tot)
 
     return A
 
 
+def generate_sparse_transition_matrix(n: int, q: int = 3) -> SparseMatrix[RESum]:
+    """generate_transition_matrix in CSR form: at most q^2 entries per row are ever built"""
+    rows: List[Dict[int, RESum]] = [{} for _ in range(len(StateSpace(n, q)))]
+    for idx_x, idx_y, f, tot in _transitions(n, q):
+        row = rows[idx_x]
+        if idx_y not in row:
+            row[idx_y] = cp(zero_REsum)
+        row[idx_y] += RationalFunc(f, tot)
+    return SparseMatrix.from_rows(rows, len(rows), cp(zero_REsum))
+
+
+def generate_poly_transition_matrix(n: int, q: int = 3) -> PolyMatrix:
+    """The transition matrix with each row over the lcm of its (at most q) distinct denominators"""
+    space = StateSpace(n, q)
+    s = len(space)
+    num, den = [], []
+    for idx_x in range(s):
+        moves = list(transition_row(space, idx_x))
+        denom = [1]
+        for _, _, tot in moves:
+            denom = poly_utils.poly_lcm(denom, tot.c)
+        row = [zero_poly] * s
+        for idx_y, f, tot in moves:
+            row[idx_y] += f * Polynomial.from_ints(poly_utils.exact_div(denom, tot.c))
+        num.append(row)
+        den.append(Polynomial.from_ints(denom))
+    return PolyMatrix(num, den)
+
+
+def denominator_lcm(A: List[List[RESum]]) -> poly_utils.INT_POLY:
+    """lcm of every denominator appearing in A"""
+    denom = [1]
+    for row in A:
+        for entry in row:
+            for key in entry.a:
+                denom = poly_utils.poly_lcm(denom, key.c)
+    return denom
+
+
 def evaluate_matrix_at_rational(A: List[List[RESum]], lambd: Rational):
+    if isinstance(A, SparseMatrix):
+        return A.map(lambda f: f(lambd), zero_rational)
     return [[f(lambd) for f in row] for row in A]
 
 
 T = TypeVar("T")
-import time
 
 
 def mult_matrix(A: List[List[T]], B: List[List[T]], add_id: Optional[T] = None):
+    if isinstance(A, PolyMatrix):
+        return A * (B if isinstance(B, PolyMatrix) else PolyMatrix.from_resum(B))
+    if isinstance(A, SparseMatrix):
+        return A * (B if isinstance(B, SparseMatrix) else SparseMatrix.from_dense(B, A.zero, _is_zero))
     add_id = 0 if add_id is None else add_id
     n, p, m = len(A), len(A[0]), len(B[0])
     C = [[cp(add_id) for _ in range(n)] for _ in range(m)]
-    mul_time = 0
-    add_time = 0
     for i in range(n):
         for j in range(p):
             for k in range(m):
-                start = time.perf_counter_ns()
-                res = A[i][j] * B[j][k]
-                mul_time += time.perf_counter_ns() - start
-                start = time.perf_counter_ns()
-                C[i][k] += res
-                add_time += time.perf_counter_ns() - start
-    print(mul_time  / 1000000000)
-    print(add_time  / 1000000000)
+                C[i][k] += A[i][j] * B[j][k]
     return C
+
+
+def _is_zero(x: T) -> bool:
+    return not len(x) if isinstance(x, RESum) else x == 0
+
+
+def iterate_power(
+    A: List[List[T]], v: List[T], steps: Optional[int] = None, add_id: Optional[T] = None, left: bool = False
+) -> Iterator[List[T]]:
+    """Yields A v, A^2 v, ... (v A, v A^2, ... if left) for steps steps, or forever if steps is None.
+    Each step costs one product per nonzero of A whose vector entry is nonzero."""
+    add_id = 0 if add_id is None else add_id
+    s = len(A)
+    if isinstance(A, SparseMatrix):
+        nonzeros = [A.row(i) for i in range(s)]
+    else:
+        nonzeros = [[(j, a) for j, a in enumerate(row) if not _is_zero(a)] for row in A]
+    k = 0
+    while steps is None or k < steps:
+        res = [cp(add_id) for _ in range(s)]
+        if left:
+            for i, row in enumerate(nonzeros):
+                if not _is_zero(v[i]):
+                    for j, a in row:
+                        res[j] += v[i] * a
+        else:
+            for i, row in enumerate(nonzeros):
+                for j, a in row:
+                    if not _is_zero(v[j]):
+                        res[i] += a * v[j]
+        v = res
+        k += 1
+        yield v
+
+
+def iterate_power_columns(
+    A: List[List[T]], columns: Iterable[int] = (0,), steps: Optional[int] = None,
+    add_id: Optional[T] = None, mul_id: Optional[T] = None
+) -> Iterator[Dict[int, List[T]]]:
+    """Yields {c: column c of A^k} for k = 1, 2, ..., without ever forming A^k"""
+    add_id = 0 if add_id is None else add_id
+    mul_id = 1 if mul_id is None else mul_id
+    streams = {
+        c: iterate_power(A, [cp(mul_id) if i == c else cp(add_id) for i in range(len(A))], steps, add_id)
+        for c in columns
+    }
+    while 1:
+        try:
+            yield {c: next(stream) for c, stream in streams.items()}
+        except StopIteration:
+            return
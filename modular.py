@@ -0,0 +1,250 @@
+"""Polynomial and matrix arithmetic over GF(p) for word-sized primes, lifted back to \\mathbb{Q} by CRT and rational
+reconstruction. Drop-in replacements for mult_matrix, RESum.sum_terms and the power iteration over RESum entries."""
+from copy import deepcopy as cp
+from math import gcd, isqrt
+from random import randrange
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+import poly_utils
+from matrix_utils import evaluate_matrix_at_rational, iterate_power
+from polynomial import Polynomial, one_poly
+from poly_matrix import PolyMatrix
+from rational import Rational, zero_rational, one_rational
+from rational_func import RationalFunc, zero_rat_func
+from re_sum import RESum
+
+MAX_PRIME = 2 ** 31  # residues below 2^31 keep a product plus a reduced accumulator inside int64
+SPLIT_BITS = 16  # matrix products split one factor into 16-bit halves so each dot product stays inside int64
+
+MATRIX_T = Union[List[List[RESum]], PolyMatrix]
+
+
+def residues(f: Polynomial, p: int) -> Optional[np.ndarray]:
+    """Coefficients of f mod p, or None if p divides the denominator of f"""
+    if f.d % p == 0:
+        return None
+    inv = pow(f.d, -1, p)
+    return np.array([x * inv % p for x in f.c], dtype=np.int64)
+
+
+def poly_mul_mod(a: np.ndarray, b: np.ndarray, p: int) -> np.ndarray:
+    """a * b over GF(p), one vectorized row per coefficient of the shorter factor"""
+    if len(a) < len(b):
+        a, b = b, a
+    res = np.zeros(len(a) + len(b) - 1, dtype=np.int64)
+    for i, y in enumerate(b.tolist()):
+        if y:
+            res[i:i + len(a)] = (res[i:i + len(a)] + a * y) % p
+    return res
+
+
+def matmul_mod(A: np.ndarray, B: np.ndarray, p: int) -> np.ndarray:
+    """A @ B over GF(p) for reduced int64 matrices with fewer than 2^16 columns in A"""
+    hi, lo = B >> SPLIT_BITS, B & ((1 << SPLIT_BITS) - 1)
+    return (((A @ hi) % p << SPLIT_BITS) + (A @ lo) % p) % p
+
+
+def poly_matmul_mod(A: np.ndarray, B: np.ndarray, p: int) -> np.ndarray:
+    """Product of polynomial matrices A (n, m, da) and B (m, l, db), coefficients last"""
+    n, m, da = A.shape
+    _, l, db = B.shape
+    res = np.zeros((n, l, da + db - 1), dtype=np.int64)
+    flat = B.reshape(m, l * db)
+    for t in range(da):
+        res[:, :, t:t + db] = (res[:, :, t:t + db] + matmul_mod(A[:, :, t], flat, p).reshape(n, l, db)) % p
+    return res
+
+
+def poly_matvec_mod(A: np.ndarray, v: np.ndarray, p: int) -> np.ndarray:
+    """A (s, s, da) applied to the polynomial vector v (s, dv)"""
+    s, _, da = A.shape
+    res = np.zeros((s, da + v.shape[1] - 1), dtype=np.int64)
+    for t in range(da):
+        res[:, t:t + v.shape[1]] = (res[:, t:t + v.shape[1]] + matmul_mod(A[:, :, t], v, p)) % p
+    return res
+
+
+def rational_reconstruction(a: int, m: int) -> Optional[Rational]:
+    """The n / d = a mod m with |n|, d <= \\sqrt{m / 2}, if there is one"""
+    bound = isqrt(m // 2)
+    r_0, r_1, t_0, t_1 = m, a % m, 0, 1
+    while r_1 > bound:
+        q = r_0 // r_1
+        r_0, r_1 = r_1, r_0 - q * r_1
+        t_0, t_1 = t_1, t_0 - q * t_1
+    if not t_1 or abs(t_1) > bound or gcd(r_1, t_1) != 1:
+        return None
+    return Rational(r_1, t_1)
+
+
+def lift(images: Callable[[int], Optional[List[int]]], check: Callable[[List[Rational]], bool]) -> List[Rational]:
+    """The rationals whose residues mod p are images(p) for every word-sized prime p (None skips a prime).
+    Stops once the reconstruction survives one more prime unchanged and passes check."""
+    res, modulus, prev = None, 1, None
+    for p in poly_utils.word_primes(MAX_PRIME):
+        img = images(p)
+        if img is None:
+            continue
+        if res is None:
+            res, modulus = img, p
+        else:
+            inv = pow(modulus, -1, p)
+            res = [r + modulus * ((y - r) * inv % p) for r, y in zip(res, img)]
+            modulus *= p
+        cand = [rational_reconstruction(r, modulus) for r in res]
+        if any(x is None for x in cand):
+            prev = None
+            continue
+        if cand == prev and check(cand):
+            return cand
+        prev = cand
+    raise ArithmeticError("ran out of primes")
+
+
+def _sample_point(*fs: Callable[[Rational], Optional[Rational]]) -> Rational:
+    """A random integer point that is not a pole of any of fs"""
+    while 1:
+        t = Rational(randrange(2, 2 ** 16), 1)
+        if all(f(t) is not None for f in fs):
+            return t
+
+
+def _uniform(A: MATRIX_T) -> Tuple[List[List[Polynomial]], Polynomial]:
+    """(E, L) with A = E / L entrywise"""
+    return (A if isinstance(A, PolyMatrix) else PolyMatrix.from_resum(A)).uniform()
+
+
+def _matrix_residues(E: List[List[Polynomial]], p: int) -> Optional[np.ndarray]:
+    """E mod p as an (n, m, width) array, or None if p divides a denominator"""
+    width = max(len(f.c) for row in E for f in row)
+    res = np.zeros((len(E), len(E[0]), width), dtype=np.int64)
+    for i, row in enumerate(E):
+        for j, f in enumerate(row):
+            r = residues(f, p)
+            if r is None:
+                return None
+            res[i, j, :len(r)] = r
+    return res
+
+
+def _chunks(coeffs: List[Rational], width: int) -> List[Polynomial]:
+    return [Polynomial(coeffs[i:i + width]) for i in range(0, len(coeffs), width)]
+
+
+def mult_matrix_modular(A: MATRIX_T, B: MATRIX_T, add_id: Optional[RESum] = None) -> MATRIX_T:
+    """A B, multiplied mod word-sized primes over the common denominators of A and B; a PolyMatrix if A is one"""
+    E_A, L_A = _uniform(A)
+    E_B, L_B = _uniform(B)
+    n, l = len(A), len(B[0])
+    width = max(len(f.c) for row in E_A for f in row) + max(len(f.c) for row in E_B for f in row) - 1
+
+    def images(p: int) -> Optional[List[int]]:
+        R_A, R_B = _matrix_residues(E_A, p), _matrix_residues(E_B, p)
+        if R_A is None or R_B is None:
+            return None
+        res = np.zeros((n, l, width), dtype=np.int64)
+        prod = poly_matmul_mod(R_A, R_B, p)
+        res[:, :, :prod.shape[2]] = prod
+        return res.ravel().tolist()
+
+    t = _sample_point(*(f for M in (A, B) for row in M for f in row))
+    A_t, B_t = evaluate_matrix_at_rational(A, t), evaluate_matrix_at_rational(B, t)
+    scale = L_A(t) * L_B(t)
+
+    def check(cand: List[Rational]) -> bool:
+        for idx, f in enumerate(_chunks(cand, width)):
+            i, k = divmod(idx, l)
+            val = zero_rational
+            for j in range(len(B)):
+                val += A_t[i][j] * B_t[j][k]
+            if f(t) != val * scale:
+                return False
+        return True
+
+    denom = L_A * L_B
+    nums = _chunks(lift(images, check), width)
+    if isinstance(A, PolyMatrix):
+        return PolyMatrix([nums[i * l:(i + 1) * l] for i in range(n)], [denom] * n)
+    return [[RESum([RationalFunc(nums[i * l + k], denom)]) for k in range(l)] for i in range(n)]
+
+
+def sum_terms_modular(x: RESum) -> RationalFunc:
+    """x.sum_terms(), with the numerator accumulated mod word-sized primes"""
+    if not x.a:
+        return cp(zero_rat_func)
+    denom = [1]
+    for key in x.a:
+        denom = poly_utils.poly_lcm(denom, key.c)
+    terms = [(num, poly_utils.exact_div(denom, key.c)) for key, num in x.a.items()]
+    width = max(len(num.c) + len(cofactor) - 1 for num, cofactor in terms)
+
+    def images(p: int) -> Optional[List[int]]:
+        res = np.zeros(width, dtype=np.int64)
+        for num, cofactor in terms:
+            r = residues(num, p)
+            if r is None:
+                return None
+            prod = poly_mul_mod(r, np.array([c % p for c in cofactor], dtype=np.int64), p)
+            res[:len(prod)] = (res[:len(prod)] + prod) % p
+        return res.tolist()
+
+    g = Polynomial.from_ints(denom)
+    t = _sample_point(x)
+    target = x(t) * g(t)
+    f = Polynomial(lift(images, lambda cand: Polynomial(cand)(t) == target))
+    return RationalFunc(f, g)
+
+
+def power_numerators_modular(A: MATRIX_T, steps: int, column: int = 0) -> List[Tuple[List[Polynomial], Polynomial]]:
+    """[(u_k, L^k) for k = 1, ..., steps] with A^k e_c = u_k / L^k, as PolyMatrix.iterate_column yields them"""
+    E, L = _uniform(A)
+    s = len(E)
+    width = max(len(f.c) for row in E for f in row)
+    widths = [k * (width - 1) + 1 for k in range(1, steps + 1)]
+
+    def images(p: int) -> Optional[List[int]]:
+        R = _matrix_residues(E, p)
+        if R is None:
+            return None
+        v = np.zeros((s, 1), dtype=np.int64)
+        v[column, 0] = 1
+        res = []
+        for w in widths:
+            v = poly_matvec_mod(R, v, p)
+            padded = np.zeros((s, w), dtype=np.int64)
+            padded[:, :v.shape[1]] = v
+            res.extend(padded.ravel().tolist())
+        return res
+
+    t = _sample_point(*(f for row in A for f in row))
+    e = [one_rational if i == column else zero_rational for i in range(s)]
+    values = list(iterate_power(evaluate_matrix_at_rational(A, t), e, steps, add_id=zero_rational))
+    L_t = L(t)
+
+    def split(cand: List[Rational]) -> List[List[Polynomial]]:
+        res, start = [], 0
+        for w in widths:
+            res.append(_chunks(cand[start:start + s * w], w))
+            start += s * w
+        return res
+
+    def check(cand: List[Rational]) -> bool:
+        scale = one_rational
+        for col, vals in zip(split(cand), values):
+            scale *= L_t
+            if any(f(t) != val * scale for f, val in zip(col, vals)):
+                return False
+        return True
+
+    res, power = [], one_poly
+    for col in split(lift(images, check)):
+        power *= L
+        res.append((col, power))
+    return res
+
+
+def power_columns_modular(A: MATRIX_T, steps: int, column: int = 0) -> List[List[RESum]]:
+    """[A e_c, A^2 e_c, ..., A^steps e_c] as iterate_power yields them"""
+    return [[RESum([RationalFunc(f, g)]) for f in col] for col, g in power_numerators_modular(A, steps, column)]
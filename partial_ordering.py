@@ -1,7 +1,15 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
 from random import random
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
 from matrix_utils import *
 from re_sum import *
+from screening import DEFAULT_GRID, screen
+from positivity_cache import PositivityCache
+from checkpoint import Checkpoint, load_checkpoint, save_checkpoint
+import instrumentation
+import positivity
+
+CHUNK_SIZE = 64  # difference polynomials per task handed to a worker
 
 
 def is_partial_ordering(r: List[List[int]]) -> bool:
@@ -12,22 +20,98 @@ def is_partial_ordering(r: List[List[int]]) -> bool:
     return reflexive and antisymmetric and transitive
 
 
-def get_max_partial_ordering(n: int) -> List[List[int]]:
-    A = generate_transition_matrix(n)
+def certify_all(
+    polys: Sequence[Polynomial], pool: Optional[Executor] = None, chunk_size: int = CHUNK_SIZE
+) -> List[positivity.CERTIFICATE]:
+    """[positivity.certificate(f.c) for f in polys], spread over pool in chunks if given, in the order of polys.
+    Deciding tiers are counted in this process either way."""
+    # the sign of f on (1, \infty) doesn't depend on its positive denominator, so c is all a worker needs
+    payload = [f.c for f in polys]
+    res = list(map(positivity.certificate, payload) if pool is None else
+               pool.map(positivity.certificate, payload, chunksize=chunk_size))
+    for cert in res:
+        positivity.tier_counts[cert[1]] += 1
+    return res
+
+
+def check_pos_above_1(
+    polys: Sequence[Polynomial], pool: Optional[Executor] = None, chunk_size: int = CHUNK_SIZE
+) -> List[bool]:
+    """[f.pos_above_1() for f in polys], spread over pool in chunks if given; results keep the order of polys"""
+    return [cert[0] for cert in certify_all(polys, pool, chunk_size)]
+
+
+def get_max_partial_ordering(
+    n: int, steps: int = 3, modular: bool = False, workers: Optional[int] = 1, chunk_size: int = CHUNK_SIZE,
+    grid: Optional[Sequence[float]] = DEFAULT_GRID, witnesses: Optional[Dict[Tuple[int, int], Rational]] = None,
+    cache: Optional[PositivityCache] = None, checkpoint: Optional[str] = None, stable_steps: Optional[int] = None,
+    q: int = 3
+) -> List[List[int]]:
+    """Maximal partial ordering of the states of the q-color chain on n vertices, indexed like StateSpace(n, q).
+    workers > 1 (or None for one per core) runs the positivity checks of each step in a process pool.
+    Differences are looked up in cache, then screened on grid (None to skip); only the rest reach the exact test.
+    Every \\lambda found with a non-positive difference is stored in witnesses[j, i] if witnesses is given.
+    With checkpoint, the state after each step is saved there and a later call resumes from it. With stable_steps,
+    the run stops early once r has gone that many steps without changing."""
+    A = generate_poly_transition_matrix(n, q)
     s = len(A)
     r = [[True] * s for _ in range(s)]
-    A_expo = cp(A)
-    for _ in range(3):
-        # print(A_expo)
-        for i in range(s):
-            for j in range(s):
-                if r[j][i] and (A_expo[i][0] - A_expo[j][0]).sum_terms().f.pos_above_1():
+    step, start = 0, None
+    state = None if checkpoint is None else load_checkpoint(checkpoint)
+    if state is not None:
+        if (state.n, state.q) != (n, q):
+            raise ValueError(f"{checkpoint} is a checkpoint for n = {state.n}, q = {state.q}, not n = {n}, q = {q}")
+        step, start, r = state.step, (state.u, state.den), state.r
+    pool = None if workers == 1 else ProcessPoolExecutor(workers)
+    # only column 0 of each power is ever read, so iterate A^k e_0 = u / L^k instead of forming A^k;
+    # L is positive above 1, so comparing two entries only needs their numerators
+    if modular:
+        from modular import power_numerators_modular
+        with instrumentation.phase("matrix_power"):  # every power at once, up front
+            cols = power_numerators_modular(A, steps)[step:]
+    else:
+        cols = A.iterate_column(0, max(steps - step, 0), start)
+    unchanged = 0
+    try:
+        for u, den in instrumentation.timed(cols, "matrix_power"):
+            step += 1
+            flips = 0
+            pairs = [(i, j) for i in range(s) for j in range(s) if r[j][i]]
+            with instrumentation.phase("differences"):
+                diffs = [u[i] - u[j] for i, j in pairs]
+            with instrumentation.phase("cache"):
+                certs = [None] * len(diffs) if cache is None else cache.get_many([f.c for f in diffs])
+            todo = [k for k, cert in enumerate(certs) if cert is None]
+            new = []
+            if grid:
+                with instrumentation.phase("screening"):
+                    for k, lambd in zip(todo, screen([diffs[k] for k in todo], grid)):
+                        if lambd is not None:
+                            certs[k] = (False, 0, lambd, [])  # tier 0: refuted by screening
+                            new.append(k)
+                todo = [k for k in todo if certs[k] is None]
+            with instrumentation.phase("pos_above_1"):
+                for k, cert in zip(todo, certify_all([diffs[k] for k in todo], pool, chunk_size)):
+                    certs[k] = cert
+                    new.append(k)
+            if cache is not None:
+                with instrumentation.phase("cache"):
+                    cache.put_many([(diffs[k].c, certs[k]) for k in new])
+            for (i, j), (pos, _, lambd, _) in zip(pairs, certs):
+                if pos:
                     r[j][i] = False
-        print("start mult")
-        import time
-        start = time.perf_counter_ns()
-        A_expo = mult_matrix(A_expo, A, add_id=zero_REsum)
-        print((time.perf_counter_ns() - start) / 1000000000)
+                    flips += 1
+                elif witnesses is not None and lambd is not None:
+                    witnesses[j, i] = lambd
+            if checkpoint is not None:
+                with instrumentation.phase("checkpoint"):
+                    save_checkpoint(checkpoint, Checkpoint(n, step, u, den, r, q))
+            unchanged = 0 if flips else unchanged + 1
+            if stable_steps is not None and unchanged >= stable_steps:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
     print("\n".join(map(str, r)))
     # assert is_partial_ordering(r)
     return r
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from typing import Iterator, List, Optional, Tuple
+
+from polynomial import Polynomial, zero_poly, one_poly
+from rational import Rational, RAT_T
+from rational_func import RationalFunc
+from re_sum import RESum
+import poly_utils
+
+
+class PolyMatrix:
+    """Matrix with A[i][j] = num[i][j] / den[i]: polynomial numerators over one denominator per row"""
+    __slots__ = ["num", "den"]
+
+    def __init__(self, _num: List[List[Polynomial]], _den: List[Polynomial]) -> None:
+        self.num, self.den = _num, _den
+
+    @staticmethod
+    def from_resum(A: List[List[RESum]]) -> PolyMatrix:
+        """Put every row of A over the lcm of its denominators"""
+        num, den = [], []
+        for row in A:
+            denom = [1]
+            for entry in row:
+                for key in entry.a:
+                    denom = poly_utils.poly_lcm(denom, key.c)
+            num.append([
+                sum((n * Polynomial.from_ints(poly_utils.exact_div(denom, key.c)) for key, n in entry.a.items()), zero_poly)
+                for entry in row
+            ])
+            den.append(Polynomial.from_ints(denom))
+        return PolyMatrix(num, den)
+
+    def to_resum(self) -> List[List[RESum]]:
+        return [[RESum([RationalFunc(f, g)]) for f in row] for row, g in zip(self.num, self.den)]
+
+    def uniform(self) -> Tuple[List[List[Polynomial]], Polynomial]:
+        """(E, L) with A = E / L entrywise, L the lcm of the row denominators"""
+        denom = [1]
+        for g in self.den:
+            denom = poly_utils.poly_lcm(denom, g.c)
+        L = Polynomial.from_ints(denom)
+        E = []
+        for row, g in zip(self.num, self.den):
+            cofactor = Polynomial.from_ints(poly_utils.exact_div(denom, g.c)) * Rational(g.d, 1)
+            E.append([f * cofactor for f in row])
+        return E, L
+
+    def __mul__(self, other: PolyMatrix) -> PolyMatrix:
+        """One polynomial-matrix product, then each row denominator picks up the lcm of other's"""
+        E, L = other.uniform()
+        cols = len(E[0])
+        num = []
+        for row in self.num:
+            res = [zero_poly] * cols
+            for j, f in enumerate(row):
+                if f is zero_poly:
+                    continue
+                for k, e in enumerate(E[j]):
+                    if e is not zero_poly:
+                        res[k] += f * e
+            num.append(res)
+        return PolyMatrix(num, [g * L for g in self.den])
+
+    def iterate_column(
+        self, column: int = 0, steps: Optional[int] = None, start: Optional[Tuple[List[Polynomial], Polynomial]] = None
+    ) -> Iterator[Tuple[List[Polynomial], Polynomial]]:
+        """Yields (u, L^k) with A^k e_column = u / L^k for k = 1, 2, ..., for steps steps or forever.
+        start resumes from a pair this yielded earlier, and column is then ignored."""
+        E, L = self.uniform()
+        nonzeros = [[(j, e) for j, e in enumerate(row) if e is not zero_poly] for row in E]
+        if start is None:
+            u, den = [one_poly if i == column else zero_poly for i in range(len(E))], one_poly
+        else:
+            u, den = start
+        k = 0
+        while steps is None or k < steps:
+            res = []
+            for row in nonzeros:
+                acc = zero_poly
+                for j, e in row:
+                    if u[j] is not zero_poly:
+                        acc += e * u[j]
+                res.append(acc)
+            u, den = res, den * L
+            k += 1
+            yield u, den
+
+    def __call__(self, x: RAT_T) -> List[List[Optional[Rational]]]:
+        res = []
+        for row, g in zip(self.num, self.den):
+            denom = g(x)
+            res.append([f(x) // denom if denom.p else None for f in row])
+        return res
+
+    def __iter__(self) -> Iterator[List[RationalFunc]]:
+        return ([RationalFunc(f, g) for f in row] for row, g in zip(self.num, self.den))
+
+    def __len__(self) -> int:
+        return len(self.num)
+
+    def __getitem__(self, item: int) -> List[RationalFunc]:
+        return [RationalFunc(f, self.den[item]) for f in self.num[item]]
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return "\n".join(" | ".join(str(f) for f in row) for row in self)
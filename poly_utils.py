@@ -0,0 +1,307 @@
+"""Kernels on integer coefficient lists [c_0, ..., c_n], shared by Polynomial and friends"""
+from math import gcd
+from typing import Iterable, List, Optional, Tuple
+
+import backends
+
+INT_POLY = List[int]
+
+SCHOOLBOOK_THRESHOLD = 8  # shorter operands are multiplied directly
+KARATSUBA_THRESHOLD = 64  # longer operands with uneven coefficient sizes are split instead of packed
+EXACT_DIV_THRESHOLD = 16  # shorter divisors are divided out term by term in exact_div
+MIGNOTTE_SLACK = 2  # bits per quotient term allowed above the size of a before exact_div gives up
+
+
+def strip(a: INT_POLY) -> INT_POLY:
+    """Clear zero coefficients off back, in place (keeps [0] for the zero polynomial)"""
+    while len(a) > 1 and not a[-1]:
+        a.pop()
+    if not a:
+        a.append(0)
+    return a
+
+
+def content(a: INT_POLY) -> int:
+    """gcd of all coefficients (0 for the zero polynomial)"""
+    return gcd(*a)
+
+
+def primitive(a: INT_POLY) -> INT_POLY:
+    """Divide out the content, keeping the sign of every coefficient"""
+    g = content(a)
+    return list(a) if g <= 1 else [x // g for x in a]
+
+
+def add(a: INT_POLY, b: INT_POLY, s: int = 1, t: int = 1) -> INT_POLY:
+    """s * a + t * b"""
+    if len(a) < len(b):
+        a, b, s, t = b, a, t, s
+    res = [s * x for x in a] if s != 1 else list(a)
+    for i, y in enumerate(b):
+        res[i] += t * y
+    return strip(res)
+
+
+def mul(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """Product, picking schoolbook, Kronecker or Karatsuba by operand shape, or the backend's own past schoolbook size"""
+    if min(len(a), len(b)) <= SCHOOLBOOK_THRESHOLD:
+        return schoolbook_mul(a, b)
+    if backends.poly_mul is not None:
+        return backends.poly_mul(a, b)
+    if min(len(a), len(b)) >= KARATSUBA_THRESHOLD:
+        # Kronecker pads every slot to the widest coefficient, so wildly uneven sizes waste most of the bigint
+        bits = [x.bit_length() for x in a] + [x.bit_length() for x in b]
+        if max(bits) > 4 * (sum(bits) // len(bits) + 1):
+            return karatsuba_mul(a, b)
+    return kronecker_mul(a, b)
+
+
+def schoolbook_mul(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """Schoolbook product"""
+    if len(a) < len(b):
+        a, b = b, a
+    res = [0] * (len(a) + len(b) - 1)
+    for j, y in enumerate(b):
+        if y:
+            for i, x in enumerate(a, j):
+                res[i] += x * y
+    return strip(res)
+
+
+def pseudo_divmod(a: INT_POLY, b: INT_POLY) -> Tuple[INT_POLY, INT_POLY, int]:
+    """Returns q, r, m with m * a = q * b + r and deg r < deg b, where m = lc(b)^(deg a - deg b + 1)"""
+    n, k = len(a) - 1, len(b) - 1
+    if n < k:
+        return [0], list(a), 1
+    lc = b[-1]
+    m = lc ** (n - k + 1)
+    r = [x * m for x in a]
+    q = [0] * (n - k + 1)
+    for i in range(n - k, -1, -1):
+        t = r[i + k] // lc  # exact, r has been scaled by lc^(i + 1)
+        q[i] = t
+        if t:
+            for j, y in enumerate(b):
+                r[i + j] -= t * y
+    return strip(q), strip(r[:k] or [0]), m
+
+
+def _pack(a: INT_POLY, width: int) -> int:
+    """sum a_i 2^(8 * width * i), built from the positive and negative parts separately"""
+    pos = b"".join(x.to_bytes(width, "little") if x > 0 else bytes(width) for x in a)
+    neg = b"".join((-x).to_bytes(width, "little") if x < 0 else bytes(width) for x in a)
+    return int.from_bytes(pos, "little") - int.from_bytes(neg, "little")
+
+
+def _unpack(x: int, width: int, n: int) -> INT_POLY:
+    """Inverse of _pack for n balanced digits, each of absolute value below 2^(8 * width - 1)"""
+    raw = x.to_bytes(width * (n + 1), "little", signed=True)
+    half, full = 1 << (8 * width - 1), 1 << (8 * width)
+    res, carry = [], 0
+    for i in range(0, width * n, width):
+        digit = int.from_bytes(raw[i:i + width], "little") + carry
+        carry = digit >= half
+        res.append(digit - full if carry else digit)
+    return res
+
+
+def kronecker_mul(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """Product via Kronecker substitution: evaluate both at a large power of two and multiply the bigints"""
+    bits = max(map(abs, a)).bit_length() + max(map(abs, b)).bit_length() + min(len(a), len(b)).bit_length() + 1
+    width = (bits + 7) // 8
+    return strip(_unpack(_pack(a, width) * _pack(b, width), width, len(a) + len(b) - 1))
+
+
+def karatsuba_mul(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """Karatsuba product; the three half-size products go back through mul"""
+    n = max(len(a), len(b))
+    if min(len(a), len(b)) <= SCHOOLBOOK_THRESHOLD:
+        return schoolbook_mul(a, b)
+    h = n // 2
+    a_lo, a_hi = a[:h] or [0], a[h:] or [0]
+    b_lo, b_hi = b[:h] or [0], b[h:] or [0]
+    lo, hi = mul(a_lo, b_lo), mul(a_hi, b_hi)
+    mid = add(mul(add(a_lo, a_hi), add(b_lo, b_hi)), add(lo, hi), 1, -1)
+    res = [0] * (len(a) + len(b) - 1)
+    for shift, part in ((0, lo), (h, mid), (2 * h, hi)):
+        for i, x in enumerate(part, shift):
+            res[i] += x
+    return strip(res)
+
+
+def exact_div(a: INT_POLY, b: INT_POLY) -> Optional[INT_POLY]:
+    """a / b when it lies in Z[x], by dividing the Kronecker images exactly; None if b does not divide a there"""
+    if len(a) < len(b):
+        return [0] if not any(a) else None
+    if len(b) <= EXACT_DIV_THRESHOLD:
+        return _exact_div_small(a, b)
+    n = len(a) - len(b) + 1
+    bits = max(max(map(abs, a)).bit_length() + n.bit_length(), max(map(abs, b)).bit_length()) + 2
+    while 1:
+        # the quotient's coefficients are usually no bigger than a's, so guess a width and grow it on failure
+        width = (bits + 7) // 8
+        a_packed, b_packed = _pack(a, width), _pack(b, width)
+        q_packed, r_packed = divmod(a_packed, b_packed)
+        if r_packed:
+            return None
+        q = strip(_unpack(q_packed, width, n))
+        if mul(q, b) == list(a):
+            return q
+        if bits > MIGNOTTE_SLACK * n + max(map(abs, a)).bit_length():
+            return None
+        bits *= 2
+
+
+def _exact_div_small(a: INT_POLY, b: INT_POLY) -> Optional[INT_POLY]:
+    """exact_div by long division, stopping at the first leading coefficient lc(b) does not divide"""
+    n, k = len(a) - 1, len(b) - 1
+    lc = b[-1]
+    r = list(a)
+    q = [0] * (n - k + 1)
+    for i in range(n - k, -1, -1):
+        x, rem = divmod(r[i + k], lc)
+        if rem:
+            return None
+        if x:
+            q[i] = x
+            for j in range(k):
+                r[i + j] -= x * b[j]
+    return strip(q) if not any(r[:k]) else None
+
+
+def _normalize_sign(a: INT_POLY) -> INT_POLY:
+    return [-x for x in a] if a[-1] < 0 else a
+
+
+def subresultant_gcd(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """gcd in Z[x] (positive leading coefficient) via the subresultant PRS, which keeps coefficient growth polynomial"""
+    if len(a) < len(b):
+        a, b = b, a
+    if not any(b):
+        return _normalize_sign(list(a))
+    c = gcd(content(a), content(b))
+    a, b = primitive(a), primitive(b)
+    g = h = 1
+    while 1:
+        delta = len(a) - len(b)
+        r = pseudo_divmod(a, b)[1]
+        if not any(r):
+            break
+        if len(r) == 1:
+            return [c]
+        scale = g * h ** delta
+        a, b = b, [x // scale for x in r]
+        g = a[-1]
+        h = g ** delta // h ** (delta - 1) if delta else h  # h^(1 - delta) g^delta, exact
+    return _normalize_sign([c * x for x in primitive(b)])
+
+
+def is_prime(n: int) -> bool:
+    """Deterministic Miller-Rabin for n < 3.3 * 10^24"""
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41):
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while not d & 1:
+        d, s = d >> 1, s + 1
+    for base in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41):
+        x = pow(base, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def word_primes(start: int = 2 ** 31) -> Iterable[int]:
+    """Primes below start, largest first"""
+    n = start - 1
+    while n > 2:
+        if is_prime(n):
+            yield n
+        n -= 2 if n & 1 else 1
+
+
+def gcd_mod(a: INT_POLY, b: INT_POLY, p: int) -> INT_POLY:
+    """Monic gcd over GF(p) of already-reduced, stripped inputs"""
+    while any(b):
+        inv = pow(b[-1], -1, p)
+        r = list(a)
+        for i in range(len(a) - len(b), -1, -1):
+            t = r[i + len(b) - 1] * inv % p
+            if t:
+                for j, y in enumerate(b):
+                    r[i + j] = (r[i + j] - t * y) % p
+        a, b = b, strip(r[:len(b) - 1] or [0])
+    inv = pow(a[-1], -1, p)
+    return [x * inv % p for x in a]
+
+
+def crt(r_1: int, m_1: int, r_2: int, m_2: int) -> int:
+    """x mod m_1 * m_2 with x = r_1 mod m_1 and x = r_2 mod m_2"""
+    return (r_1 + m_1 * ((r_2 - r_1) * pow(m_1, -1, m_2) % m_2)) % (m_1 * m_2)
+
+
+def symmetric(a: INT_POLY, m: int) -> INT_POLY:
+    """Lift residues mod m to (-m/2, m/2]"""
+    half = m // 2
+    return [x - m if x > half else x for x in a]
+
+
+def modular_gcd(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """gcd in Z[x] (positive leading coefficient) from gcds mod word-sized primes, lifted by CRT"""
+    if len(a) < len(b):
+        a, b = b, a
+    if not any(b):
+        return _normalize_sign(list(a))
+    c = gcd(content(a), content(b))
+    a, b = primitive(a), primitive(b)
+    lc_gcd = gcd(a[-1], b[-1])  # the true gcd, scaled to have this leading coefficient, has integral coefficients
+    res, modulus, deg = None, 1, len(b) + 1
+    for p in word_primes():
+        if a[-1] % p == 0 or b[-1] % p == 0:
+            continue
+        g_p = gcd_mod([x % p for x in a], strip([x % p for x in b]), p)
+        if len(g_p) == 1:
+            return [c]
+        if len(g_p) > deg:
+            continue  # unlucky prime
+        g_p = [x * lc_gcd % p for x in g_p]
+        if len(g_p) < deg:  # every earlier prime was unlucky
+            res, modulus, deg = g_p, p, len(g_p)
+            continue
+        old_res = symmetric(res, modulus)
+        res = [crt(x, modulus, y, p) for x, y in zip(res, g_p)]
+        modulus *= p
+        cand = symmetric(res, modulus)
+        if cand == old_res:  # CRT image stopped moving, so it's probably the true gcd
+            cand = primitive(cand)
+            if exact_div(a, cand) is not None and exact_div(b, cand) is not None:
+                return _normalize_sign([c * x for x in cand])
+    raise ArithmeticError("ran out of primes")
+
+
+def poly_gcd(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """gcd in Z[x] with positive leading coefficient"""
+    if backends.poly_gcd is not None:
+        return backends.poly_gcd(a, b)
+    if min(len(a), len(b)) <= SCHOOLBOOK_THRESHOLD:
+        return subresultant_gcd(a, b)
+    return modular_gcd(a, b)
+
+
+def derivative(a: INT_POLY) -> INT_POLY:
+    return [i * x for i, x in enumerate(a) if i] or [0]
+
+
+def poly_lcm(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    """lcm in Z[x] with positive leading coefficient"""
+    if not any(a) or not any(b):
+        return [0]
+    return _normalize_sign(mul(exact_div(a, poly_gcd(a, b)), b))
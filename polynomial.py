@@ -1,127 +1,152 @@
 from __future__ import annotations
 import json
-from typing import List, Tuple, Iterable, Union
-from copy import deepcopy as cp
+from functools import lru_cache
+from math import gcd, lcm
+from typing import List, Sequence, Tuple, Iterable, Union
 import expr_utils
+import poly_utils
+import positivity
 
-from rational import Rational, _RAT_T, RAT_T, zero_rational, one_rational
+from rational import Rational, _RAT_T, RAT_T
 
 
 class Polynomial:
-    """Elements of \\mathbb{Q}[x], where coefficients are represented as a list [a_0, ..., a_n]"""
-    __slots__ = ["a", "_sturm"]
+    """Elements of \\mathbb{Q}[x]: immutable, stored as integer numerators (c_0, ..., c_n) over one shared
+    denominator d > 0, with gcd(c_0, ..., c_n, d) = 1"""
+    __slots__ = ["c", "d", "_hash"]
 
-    def __init__(self, _a: List[RAT_T]) -> None:
+    def __new__(cls, _a: List[RAT_T]) -> Polynomial:
         if not isinstance(_a, list) or any(not isinstance(x, _RAT_T) for x in _a):
             raise TypeError("ur input to polynomial sucks")
-        self.a = [Rational(x, 1) if isinstance(x, int) else x for x in _a]
-        self._sturm = None
+        d = 1
+        for x in _a:
+            if isinstance(x, Rational):
+                d = lcm(d, x.q)
+        return Polynomial.from_ints([x * d if isinstance(x, int) else x.p * (d // x.q) for x in _a], d)
+
+    @staticmethod
+    def from_ints(c: Sequence[int], d: int = 1) -> Polynomial:
+        """Canonical form of c / d; c is never modified"""
+        n = len(c)
+        while n > 1 and not c[n - 1]:
+            n -= 1
+        if not n or (n == 1 and not c[0]):
+            return zero_poly
+        if d < 0:
+            c, d = [-x for x in c[:n]], -d
+        g = gcd(d, *c[:n])
+        c = tuple(c[:n]) if g == 1 else tuple(x // g for x in c[:n])
+        d //= g
+        if n == 1 and d == 1 and c[0] == 1:
+            return one_poly
+        return Polynomial._make(c, d)
+
+    @staticmethod
+    def _make(c: Tuple[int, ...], d: int) -> Polynomial:
+        """Wrap an already canonical (c, d)"""
+        res = object.__new__(Polynomial)
+        object.__setattr__(res, "c", c)
+        object.__setattr__(res, "d", d)
+        object.__setattr__(res, "_hash", None)
+        return res
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("Polynomial is immutable")
 
     def simplify(self) -> None:
-        """Clear zero coefficients off back"""
-        for coeff in self:
-            coeff.simplify()
-        while len(self.a) > 1 and self.a[-1].p == 0:
-            self.a.pop()
+        """Already canonical; kept for callers of the mutable API"""
+
+    @property
+    def a(self) -> List[Rational]:
+        """Coefficients as a list of Rationals"""
+        return list(self)
 
     def _shift(self, n: int) -> Polynomial:
         """Multiply by x^n"""
-        self.a = [cp(zero_rational) for _ in range(n)] + self.a
-        return self
+        return Polynomial._make((0,) * n + self.c, self.d) if any(self.c) else self
 
     def _get_monic(self) -> Polynomial:
-        return cp(self) * Rational(self[-1].q, self[-1].p)
+        return Polynomial.from_ints(self.c, self.c[-1]) if any(self.c) else self
 
     def __add__(self, other: POLY_T) -> Polynomial:
-        return cp(self).__iadd__(other)
-
-    def __iadd__(self, other: POLY_T) -> Polynomial:
         if isinstance(other, _RAT_T):
-            self[0] += other
-        elif isinstance(other, Polynomial):
-            while len(self.a) < len(other.a):
-                self.a.append(cp(zero_rational))
-            for self_coeff, other_coeff in zip(self, other):
-                self_coeff += other_coeff
-        else:
-            raise NotImplementedError()
-        self.simplify()
-        return self
+            other = Polynomial([other])
+        elif not isinstance(other, Polynomial):
+            return NotImplemented
+        if other is zero_poly:
+            return self
+        if self is zero_poly:
+            return other
+        d = lcm(self.d, other.d)
+        return Polynomial.from_ints(poly_utils.add(self.c, other.c, d // self.d, d // other.d), d)
+
+    __radd__ = __add__
 
     def __sub__(self, other: POLY_T) -> Polynomial:
-        return cp(self).__isub__(other)
+        return self + (-other)
 
-    def __isub__(self, other: POLY_T) -> Polynomial:
-        return self.__iadd__(other * Rational(-1, 1))
+    def __rsub__(self, other: RAT_T) -> Polynomial:
+        return (-self) + other
 
-    def __mul__(self, other: POLY_T) -> Polynomial:
-        return cp(self).__imul__(other)
+    def __neg__(self) -> Polynomial:
+        return Polynomial._make(tuple(-x for x in self.c), self.d) if any(self.c) else self
 
-    def __imul__(self, other: POLY_T) -> Polynomial:
-        if isinstance(other, _RAT_T):
-            for coeff in self:
-                coeff *= other
-        elif isinstance(other, Polynomial):
-            if other is self:
-                other = cp(self)
-            old_self = cp(self)
-            self.a.clear()
-            res = []
-            for new_deg in range(len(old_self) + len(other) - 1):
-                res.append(cp(zero_rational))
-                for pos_1, self_coeff in enumerate(old_self):
-                    if new_deg - pos_1 < 0:
-                        break
-                    if new_deg - pos_1 < len(other):
-                        res[-1] += self_coeff * other[new_deg - pos_1]
-            self.a = res
-        else:
-            raise NotImplementedError()
-        return self
+    def __mul__(self, other: POLY_T) -> Polynomial:
+        if isinstance(other, int):
+            return Polynomial.from_ints([x * other for x in self.c], self.d) if other != 1 else self
+        if isinstance(other, Rational):
+            return Polynomial.from_ints([x * other.p for x in self.c], self.d * other.q)
+        if isinstance(other, Polynomial):
+            if other is one_poly:
+                return self
+            if self is one_poly:
+                return other
+            return Polynomial.from_ints(poly_utils.mul(self.c, other.c), self.d * other.d)
+        return NotImplemented
+
+    __rmul__ = __mul__
 
     def __divmod__(self, b: Polynomial) -> Tuple[Polynomial, Polynomial]:
-        a = cp(self)
-        q = Polynomial([0])  # remainder
-        while len(a) >= len(b):
-            if len(a) == len(b) == 1 and a[0].p == 0:
-                break
-            temp = cp(one_poly)  # record multiple of b to subtract from a
-            temp *= a[-1] // b[-1]  # replace leading coeff of b with leading coeff of a
-            temp._shift(len(a) - len(b))  # bump up degree
-            q += temp  # add to quotient
-            a -= temp * b  # subtract
-        return q, a
+        if not any(b.c):
+            raise ZeroDivisionError("polynomial division by zero")
+        # m * self.c = q * b.c + r, so self = (q * b.d / (m * self.d)) * b + r / (m * self.d)
+        q, r, m = poly_utils.pseudo_divmod(self.c, b.c)
+        return Polynomial.from_ints([x * b.d for x in q], m * self.d), Polynomial.from_ints(r, m * self.d)
 
     def __floordiv__(self, other: POLY_T) -> Polynomial:
         other = expr_utils.cast_up(other, Polynomial, read_only=True)
+        if not any(other.c):
+            raise ZeroDivisionError("polynomial division by zero")
+        q = poly_utils.exact_div(self.c, other.c)  # the usual case, e.g. every division in yun_factorization
+        if q is not None:
+            return Polynomial.from_ints([x * other.d for x in q], self.d)
         return self.__divmod__(other)[0]
 
     def __mod__(self, other: Polynomial) -> Polynomial:
         return self.__divmod__(other)[1]
 
     def __call__(self, x: RAT_T) -> Rational:
-        res = cp(zero_rational)
-        for coeff in reversed(self):
-            res += coeff
-            res *= x
-        return res
+        p, q = (x, 1) if isinstance(x, int) else (x.p, x.q)
+        res, q_pow = self.c[-1], 1
+        for coeff in reversed(self.c[:-1]):  # homogenised Horner: sum c_i p^i q^(n - i)
+            q_pow *= q
+            res = res * p + coeff * q_pow
+        return Rational(res, self.d * q_pow)
 
     def __getitem__(self, item: int) -> Rational:
-        return self.a[item]
-
-    def __setitem__(self, item: int, x: Rational) -> None:
-        self.a[item] = x
+        return Rational(self.c[item], self.d)
 
     def __iter__(self) -> Iterable[Rational]:
-        return iter(self.a)
+        return (Rational(x, self.d) for x in self.c)
 
     def __len__(self) -> int:
-        return len(self.a)
+        return len(self.c)
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def monomial(n: int) -> Polynomial:
         """Returns x^n"""
-        return Polynomial([cp(zero_rational) for _ in range(n)] + [cp(one_rational)])
+        return Polynomial.from_ints((0,) * n + (1,))
 
     def __repr__(self) -> str:
         return str(self)
@@ -139,49 +164,28 @@ class Polynomial:
         return ret.replace("+-", "-").replace("-1λ", "-λ") or "0"
 
     def __eq__(self, o: Polynomial) -> bool:
-        o = expr_utils.cast_up(o, Polynomial, read_only=True)
-        return isinstance(o, Polynomial) and (self - o).a == [zero_rational]
+        if self is o:
+            return True
+        if not isinstance(o, Polynomial):
+            f = expr_utils.promotion(type(o), Polynomial)
+            if f is None:
+                return NotImplemented
+            o = f(o)
+        return self.d == o.d and self.c == o.c
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            # constants hash like the Rational (and int) they equal
+            h = hash(Rational(self.c[0], self.d)) if len(self.c) == 1 else hash((self.c, self.d))
+            object.__setattr__(self, "_hash", h)
+        return self._hash
 
     def toJSON(self):
-        return json.dumps(self, default=lambda o: o.__dict__,  sort_keys=True, indent=4)
+        return json.dumps({"c": list(self.c), "d": self.d}, sort_keys=True, indent=4)
 
     def pos_above_1(self) -> bool:
-        if self == zero_poly:
-            return True
-        return self(1) >= 0 and all(f.sq_fr_pos_above_1() for f in self.yun_factorization())
-
-    def sq_fr_pos_above_1(self) -> bool:
-        # main idea: find all ranges with only one root inside, and check f(end pts) >= 0
-        f = cp(self)
-        while f(1) == 0:
-            f //= Polynomial([-1, 1])  # keep dividing out x - 1
-        if f(1) < 0:
-            return False
-
-        root_lb, root_ub = Rational(1, 1), f.root_upper_bound()
-        stack = [(root_lb, root_ub)]
-        single_root_ints = []
-        while stack:
-            a, b = stack.pop()
-            roots = f.unique_zeros_in_region(a, b)
-            if roots == 1:
-                single_root_ints.append((a, b))
-            elif roots > 1:
-                stack.append((a, (a + b) // 2))
-                stack.append(((a + b) // 2, b))
-        assert len(single_root_ints) == f.unique_zeros_in_region(root_lb, root_ub)
-
-        for a, b in single_root_ints:
-            if f(b) == 0:  # edge case
-                # we want our root to be in (a, b)
-                # we try to extend our interval by some r = 2^-i, making sure to disinclude any higher root
-                r = cp(one_rational)
-                while f.unique_zeros_in_region(b,  b + r):
-                    r //= 2
-                b += r
-            if f(a) < 0 or f(b) < 0:
-                return False
-        return True
+        """Whether self > 0 on (1, \\infty), by the cheapest certificate that decides it (see positivity)"""
+        return positivity.pos_above_1(self.c)
 
     def yun_factorization(self) -> List[Polynomial]:
         if self == zero_poly:
@@ -198,66 +202,28 @@ class Polynomial:
             c = d // a
             d = c - b.derivative()
             if len(b) == 1:
-                res[-1] *= b
+                res[-1] = res[-1] * b
                 break
         return res
 
     def gcd(self, b: Polynomial) -> Polynomial:
-        """Euclidean algorithm on polynomials"""
-        a = self
-        while b != zero_poly:
-            a, b = b, a % b
-        return a._get_monic()
-
-    def V(self, x: Rational) -> int:
-        """V function as defined by Sturm's theorem"""
-        sturm_eval = [y for f in self.sturm if (y := f(x)) != 0]
-        return sum(
-            1 for i in range(len(sturm_eval)) 
-            if i and (sturm_eval[i] > 0) != (sturm_eval[i - 1] > 0)
-        )
-
-    def unique_zeros_in_region(self, a: Rational, b: Rational) -> int:
-        return self.V(a) - self.V(b)
-
-    @property
-    def sturm(self) -> List[Polynomial]:
-        if self._sturm:
-            return self._sturm
-        ret = [cp(self), self.derivative()]
-        while ret[-1] != zero_poly:
-            ret.append((ret[-2] % ret[-1]) * -1)
-        return ret
+        """Monic gcd, computed on the integer numerators by subresultant PRS or modular CRT (see poly_utils.poly_gcd)"""
+        return Polynomial.from_ints(poly_utils.poly_gcd(self.c, b.c))._get_monic()
 
     def derivative(self) -> Polynomial:
-        res = cp(zero_poly)
-        for i, coeff in enumerate(self):
-            if i:
-                res += Polynomial.monomial(i - 1) * coeff * i
-        return res
-
-    def root_upper_bound(self) -> Rational:
-        mx = 0
-        for i in range(len(self) - 1):
-            res = self[i] // self[-1]
-            if res.p < 0:
-                res.p = -res.p
-            mx = max(mx, res)
-        return mx + 1
+        return Polynomial.from_ints([i * coeff for i, coeff in enumerate(self.c) if i] or [0], self.d)
 
     def __deepcopy__(self, memodict={}):
-        res = EmptyPoly()
-        res.a = [cp(x) for x in self.a]
-        res._sturm = None
-        res.__class__ = Polynomial
-        return res
+        return self
 
+    def __reduce__(self):
+        return Polynomial.from_ints, (self.c, self.d)
 
-class EmptyPoly(object):
-    __slots__ = ["a", "_sturm"]
 
-zero_poly = Polynomial([0])
-one_poly = Polynomial([1])
+zero_poly = Polynomial._make((0,), 1)
+one_poly = Polynomial._make((1,), 1)
 
 POLY_T = Union[Polynomial, RAT_T]
 _POLY_T = Polynomial, *_RAT_T
+
+expr_utils.register_promotion(Rational, Polynomial, lambda x: Polynomial([x]))
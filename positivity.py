@@ -0,0 +1,107 @@
+"""Tiered certificates for p > 0 on (1, \\infty): coefficient signs of p(x + 1), then interval arithmetic with adaptive
+subdivision, then exact root isolation. tier_counts records which tier decided each case."""
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import root_isolation
+from poly_utils import INT_POLY
+from rational import Rational
+
+MAX_INTERVALS = 256  # subintervals tier 2 may examine before handing the case to tier 3
+
+# (decision, tier, witness \lambda, isolating intervals of the roots above 1)
+CERTIFICATE = Tuple[bool, int, Optional[Rational], List[Tuple[Rational, Rational]]]
+
+tier_counts: Counter = Counter()  # tier -> cases it decided, since the last reset_counts()
+
+
+def reset_counts() -> None:
+    tier_counts.clear()
+
+
+def positive_root_bound(a: INT_POLY) -> int:
+    """A power of two above every positive root of a (lc > 0): the Kioustelidis bound 2 max (|a_i| / lc)^(1 / (n - i))
+    over the negative a_i, rounded up"""
+    n, lc = len(a) - 1, a[-1]
+    e = 0
+    for i, x in enumerate(a[:-1]):
+        if x < 0:
+            e = max(e, (x.bit_length() - lc.bit_length()) // (n - i))
+            while -x > lc << (e * (n - i)):
+                e += 1
+    return 2 << e
+
+
+def _horner(a: INT_POLY, p: int, e: int) -> int:
+    """2^(e deg a) a(p / 2^e)"""
+    res, q_pow = a[-1], 1
+    for x in reversed(a[:-1]):
+        q_pow <<= e
+        res = res * p + x * q_pow
+    return res
+
+
+def _lower_bound(a: INT_POLY, lo: int, hi: int, e: int) -> int:
+    """2^(e deg a) times a lower bound for a on [lo / 2^e, hi / 2^e] with lo >= 0: each monomial is monotone there"""
+    return _horner([max(x, 0) for x in a], lo, e) + _horner([min(x, 0) for x in a], hi, e)
+
+
+def _tier_1(a: INT_POLY) -> Tuple[Optional[bool], INT_POLY]:
+    """Decides from the signs of the coefficients of a(x + 1); otherwise returns that shift with x^k divided out"""
+    if a[-1] < 0:
+        return False, a
+    q = root_isolation.taylor_shift(a)
+    k = next(i for i, x in enumerate(q) if x)  # x = 1 is a root of multiplicity k, which is allowed
+    q = q[k:]
+    if q[0] < 0:
+        return False, q  # negative just above 1
+    if all(x >= 0 for x in q):
+        return True, q
+    return None, q
+
+
+def _tier_2(q: INT_POLY) -> Tuple[Optional[bool], Optional[Rational]]:
+    """Whether q > 0 on (0, \\infty), for q(0) > 0 and lc > 0, by exact interval bounds on dyadic subintervals of
+    (0, B], B a root bound; None if MAX_INTERVALS of them didn't settle it. Refutations come with an x where q <= 0."""
+    stack = [(0, positive_root_bound(q), 0)]  # [lo / 2^e, hi / 2^e]
+    budget = MAX_INTERVALS
+    while stack:
+        lo, hi, e = stack.pop()
+        if _lower_bound(q, lo, hi, e) > 0:
+            continue
+        budget -= 1
+        if not budget:
+            return None, None
+        mid = lo + hi
+        if _horner(q, mid, e + 1) <= 0:
+            return False, Rational(mid, 1 << (e + 1))
+        stack.append((mid, hi << 1, e + 1))
+        stack.append((lo << 1, mid, e + 1))
+    return True, None
+
+
+def certificate(a: INT_POLY) -> CERTIFICATE:
+    """(a == 0 or a > 0 on (1, \\infty), the tier that decided it, a \\lambda > 1 with a(\\lambda) <= 0 if one turned
+    up, isolating intervals of the roots above 1 if it came to isolating them)"""
+    if not any(a):
+        return True, 1, None, []
+    res, q = _tier_1(a)
+    if res is not None:
+        return res, 1, None, []
+    res, x = _tier_2(q)
+    if res is not None:
+        return res, 2, None if x is None else x + 1, []
+    intervals = root_isolation.roots_above_1(a)
+    return not intervals, 3, None, intervals
+
+
+def certify(a: INT_POLY) -> Tuple[bool, int]:
+    """(a == 0 or a > 0 on (1, \\infty), the tier that decided it)"""
+    return certificate(a)[:2]
+
+
+def pos_above_1(a: INT_POLY) -> bool:
+    """certify(a)[0], counting the tier in tier_counts"""
+    res, tier = certify(a)
+    tier_counts[tier] += 1
+    return res
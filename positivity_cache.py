@@ -0,0 +1,172 @@
+"""On-disk, content-addressed cache of pos_above_1 certificates, shared by every process that opens the same file"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import poly_utils
+from poly_utils import INT_POLY
+from positivity import CERTIFICATE
+from rational import Rational
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+EVICT_FRACTION = 0.25  # share of the least recently used entries dropped once the cache outgrows max_bytes
+SQL_BATCH = 500  # keys per query, below SQLite's limit on bound parameters
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS certificates (
+        key BLOB PRIMARY KEY,
+        pos INTEGER NOT NULL,
+        tier INTEGER NOT NULL,
+        witness TEXT,
+        intervals TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        used REAL NOT NULL
+    )""",
+    # running size and count of certificates, kept by the triggers below so evict never has to scan the table
+    """CREATE TABLE IF NOT EXISTS totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        size INTEGER NOT NULL,
+        count INTEGER NOT NULL
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS certificates_insert AFTER INSERT ON certificates BEGIN
+        UPDATE totals SET size = size + NEW.size, count = count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS certificates_delete AFTER DELETE ON certificates BEGIN
+        UPDATE totals SET size = size - OLD.size, count = count - 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS certificates_resize AFTER UPDATE OF size ON certificates BEGIN
+        UPDATE totals SET size = size + NEW.size - OLD.size;
+    END""",
+)
+
+
+def cache_key(a: INT_POLY) -> bytes:
+    """Hash of the primitive part of a, which has the same sign everywhere"""
+    return hashlib.blake2b(",".join(map(str, poly_utils.primitive(a))).encode(), digest_size=16).digest()
+
+
+def _dump_rational(x: Rational) -> str:
+    return str(x)
+
+
+def _load_rational(s: str) -> Rational:
+    return Rational(*map(int, s.split("/")))
+
+
+class PositivityCache:
+    """SQLite file of {cache_key(a): certificate(a)} with least-recently-used eviction past max_bytes.
+    Each process lazily opens its own connection, and WAL mode lets readers and one writer work concurrently."""
+    __slots__ = ["path", "max_bytes", "hits", "misses", "_conn", "_pid"]
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path, self.max_bytes = path, max_bytes
+        self.hits = self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():  # connections must not cross a fork
+            self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+            with self._transaction() as conn:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                if conn.execute("SELECT 1 FROM totals").fetchone() is None:  # new file, or one from before totals
+                    conn.execute("INSERT INTO totals SELECT 0, COALESCE(SUM(size), 0), COUNT(*) FROM certificates")
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue instead of deadlocking"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_many(self, polys: Sequence[INT_POLY]) -> List[Optional[CERTIFICATE]]:
+        """Cached certificates of polys, None where there is none; hits count as uses for eviction"""
+        keys = [cache_key(a) for a in polys]
+        found: Dict[bytes, CERTIFICATE] = {}
+        for start in range(0, len(keys), SQL_BATCH):
+            batch = keys[start:start + SQL_BATCH]
+            rows = self.conn.execute(
+                f"SELECT key, pos, tier, witness, intervals FROM certificates WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, pos, tier, witness, intervals in rows:
+                found[key] = (
+                    bool(pos), tier, None if witness is None else _load_rational(witness),
+                    [(_load_rational(lo), _load_rational(hi)) for lo, hi in json.loads(intervals)],
+                )
+        if found:
+            now = time.time()
+            with self._transaction() as conn:
+                conn.executemany("UPDATE certificates SET used = ? WHERE key = ?", [(now, k) for k in found])
+        res = [found.get(k) for k in keys]
+        hits = sum(x is not None for x in res)
+        self.hits += hits
+        self.misses += len(res) - hits
+        return res
+
+    def get(self, a: INT_POLY) -> Optional[CERTIFICATE]:
+        return self.get_many([a])[0]
+
+    def put_many(self, items: Sequence[tuple]) -> None:
+        """Store (a, certificate(a)) pairs, then evict if the cache has outgrown max_bytes"""
+        now = time.time()
+        rows = []
+        for a, (pos, tier, witness, intervals) in items:
+            key = cache_key(a)
+            witness = None if witness is None else _dump_rational(witness)
+            intervals = json.dumps([[_dump_rational(lo), _dump_rational(hi)] for lo, hi in intervals])
+            rows.append((key, int(pos), tier, witness, intervals, len(key) + len(witness or "") + len(intervals), now))
+        if not rows:
+            return
+        with self._transaction() as conn:
+            # an upsert rather than INSERT OR REPLACE, whose implicit delete wouldn't fire certificates_delete
+            conn.executemany(
+                "INSERT INTO certificates VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET pos = excluded.pos, "
+                "tier = excluded.tier, witness = excluded.witness, intervals = excluded.intervals, size = excluded.size, "
+                "used = excluded.used",
+                rows,
+            )
+        self.evict()
+
+    def put(self, a: INT_POLY, certificate: CERTIFICATE) -> None:
+        self.put_many([(a, certificate)])
+
+    def evict(self) -> None:
+        """Drop the least recently used EVICT_FRACTION of the entries while their total size exceeds max_bytes"""
+        with self._transaction() as conn:
+            while 1:
+                size, count = conn.execute("SELECT size, count FROM totals").fetchone()
+                if size <= self.max_bytes:
+                    return
+                conn.execute(
+                    "DELETE FROM certificates WHERE key IN (SELECT key FROM certificates ORDER BY used LIMIT ?)",
+                    (max(1, int(count * EVICT_FRACTION)),),
+                )
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT count FROM totals").fetchone()[0]
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        return self.path, self.max_bytes
+
+    def __setstate__(self, state) -> None:
+        self.__init__(*state)
@@ -1,87 +1,92 @@
 from __future__ import annotations
 from functools import total_ordering
 from typing import Union
-from copy import deepcopy as cp
-from expr_utils import cast_up
-
-def gcd(a: int, b: int):
-    """Euclidean Algorithm"""
-    while b:
-        a, b = b, a % b
-    return a
+import expr_utils
+from backends import gcd
 
 @total_ordering
 class Rational:
-    """Elements of \\mathbb{Q}"""
+    """Elements of \\mathbb{Q}, immutable and always in lowest terms with q > 0"""
     __slots__ = ["p", "q"]
 
-    def __init__(self, _p: int, _q: int) -> None:
-        self.p, self.q = _p, _q
+    def __new__(cls, _p: int, _q: int = 1) -> Rational:
+        if _q <= 0:
+            if not _q:
+                raise ZeroDivisionError("Rational with zero denominator")
+            _p, _q = -_p, -_q
+        if _q != 1:
+            g = gcd(_p, _q)
+            if g != 1:
+                _p, _q = _p // g, _q // g
+        if _q == 1 and -1 <= _p <= 1 and _p in _interned:
+            return _interned[_p]
+        self = object.__new__(cls)
+        object.__setattr__(self, "p", _p)
+        object.__setattr__(self, "q", _q)
+        return self
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("Rational is immutable")
 
     def simplify(self) -> None:
-        """Run gcd on args"""
-        g = gcd(self.p, self.q)
-        self.p, self.q = self.p // g, self.q // g
+        """Already canonical; kept for callers of the mutable API"""
 
     def __add__(self, other: RAT_T) -> Rational:
-        return cp(self).__iadd__(other)
+        if isinstance(other, int):
+            return Rational(self.p + other * self.q, self.q) if other else self
+        if not isinstance(other, Rational):
+            return NotImplemented
+        return Rational(self.p * other.q + other.p * self.q, self.q * other.q)
 
-    def __iadd__(self, other: RAT_T) -> Rational:
-        other = cast_up(other, Rational, read_only=True)
-        self.p = self.p * other.q + other.p * self.q
-        self.q *= other.q
-        self.simplify()
-        return self
+    __radd__ = __add__
+
+    def __rsub__(self, other: RAT_T) -> Rational:
+        return (-self) + other
 
     def __sub__(self, other: RAT_T) -> Rational:
-        return cp(self).__isub__(other)
+        return self + (-other)
 
-    def __isub__(self, other: RAT_T) -> Rational:
-        return self.__iadd__(other * -1)
+    def __neg__(self) -> Rational:
+        return Rational(-self.p, self.q)
 
     def __mul__(self, other: RAT_T) -> Rational:
-        return cp(self).__imul__(other)
-
-    def __imul__(self, other: RAT_T) -> Rational:
         if not isinstance(other, _RAT_T):
-            raise NotImplementedError()
+            return NotImplemented
         if isinstance(other, int):
-            other = Rational(other, 1)
-        self.p *= other.p
-        self.q *= other.q
-        self.simplify()
-        return self
+            return Rational(self.p * other, self.q) if other != 1 else self
+        return Rational(self.p * other.p, self.q * other.q)
 
-    def __floordiv__(self, other: RAT_T) -> Rational:
-        return cp(self).__ifloordiv__(other)
+    __rmul__ = __mul__
 
-    def __ifloordiv__(self, other: RAT_T) -> Rational:
+    def __floordiv__(self, other: RAT_T) -> Rational:
         if not isinstance(other, _RAT_T):
-            raise NotImplementedError()
+            return NotImplemented
         if isinstance(other, int):
-            other = Rational(other, 1)
-        self.p *= other.q
-        self.q *= other.p
-        self.simplify()
-        return self
+            return Rational(self.p, self.q * other)
+        return Rational(self.p * other.q, self.q * other.p)
+
+    def __rfloordiv__(self, other: int) -> Rational:
+        return Rational(other * self.q, self.p)
 
     def __getitem__(self, item: int) -> int:
         return self.q if item else self.p
 
-    def __setitem__(self, item: int, x: int):
-        if item:
-            self.q = x
-        else:
-            self.p = x
-
     def __eq__(self, o: RAT_T) -> bool:
         if isinstance(o, int):
-            o = Rational(o, 1)
-        return isinstance(o, Rational) and self.p * o.q == self.q * o.p
+            return self.q == 1 and self.p == o
+        if not isinstance(o, Rational):
+            return NotImplemented  # lets higher types, which hash alike when equal, compare by promotion
+        return self.p == o.p and self.q == o.q
+
+    def __hash__(self) -> int:
+        return hash(self.p) if self.q == 1 else hash((self.p, self.q))
 
     def __lt__(self, o: RAT_T) -> bool:
-        o = cast_up(o, Rational, read_only=True)
-        return isinstance(o, Rational) and self.p * o.q < self.q * o.p
+        if isinstance(o, int):
+            return self.p < o * self.q
+        if not isinstance(o, Rational):
+            return NotImplemented
+        return self.p * o.q < self.q * o.p
 
     def __repr__(self) -> str:
         return str(self)
@@ -90,10 +95,17 @@ class Rational:
         return str(self.p) if self.q == 1 else f"{self.p}/{self.q}"
 
     def __deepcopy__(self, memodict={}):
-        return Rational(self.p, self.q)
+        return self
 
+    def __reduce__(self):
+        return Rational, (self.p, self.q)
+
+_interned = {}
+_interned.update((p, Rational(p, 1)) for p in (-1, 0, 1))
 zero_rational = Rational(0, 1)
 one_rational = Rational(1, 1)
 
 RAT_T = Union[Rational, int]
 _RAT_T = Rational, int
+
+expr_utils.register_promotion(int, Rational, lambda x: Rational(x, 1))
@@ -17,7 +17,7 @@ class RationalFunc:
         """Simplify both f and g"""
         self.f.simplify()
         if self.f == zero_poly:
-            self.g = cp(one_poly)
+            self.g = one_poly
         else:
             self.g.simplify()
 
@@ -66,14 +66,16 @@ class RationalFunc:
         if isinstance(o, Rational):
             o = Polynomial([o])
         if isinstance(o, Polynomial):
-            o = RationalFunc(o, cp(one_poly))
+            o = RationalFunc(o, one_poly)
         return isinstance(o, RationalFunc) and self.f * o.g == self.g * o.f
 
     def __deepcopy__(self, memodict={}):
-        return RationalFunc(cp(self.f), cp(self.g))
+        return RationalFunc(self.f, self.g)
 
 RF_T = Union[RationalFunc, POLY_T]
 _RF_T = RationalFunc, *_POLY_T
 
-zero_rat_func = RationalFunc(cp(zero_poly), cp(one_poly))
-one_rat_func = RationalFunc(cp(one_poly), cp(one_poly))
\ No newline at end of file
+expr_utils.register_promotion(Polynomial, RationalFunc, lambda x: RationalFunc(x, one_poly))
+
+zero_rat_func = RationalFunc(zero_poly, one_poly)
+one_rat_func = RationalFunc(one_poly, one_poly)
\ No newline at end of file
@@ -2,48 +2,73 @@
 
 
 from __future__ import annotations
-from typing import Dict, Iterable, Optional, Union, List
+from math import gcd
+from typing import Dict, Iterable, Optional, Tuple, Union, List
 from copy import deepcopy as cp
 
 from polynomial import Polynomial, zero_poly
 from rational import Rational, RAT_T, zero_rational
 from rational_func import zero_rat_func, one_rat_func, RationalFunc, RF_T, _RF_T
 import expr_utils
+import poly_utils
 
 
 class RESum:
-    """Sum of rational expressions"""
+    """Sum of rational expressions, kept as {canonical denominator: numerator}"""
     __slots__ = ["a"]
+    max_terms = 64  # past this many distinct denominators, all terms are merged over their lcm
+    peak_terms = 0  # most terms any RESum has held
 
-    def __init__(self, _a: Dict[Polynomial, Polynomial]) -> None:
-        self.a = _a
+    def __init__(self, _a: List[RationalFunc]) -> None:
+        self.a: Dict[Polynomial, Polynomial] = {}
+        for rat_fun in _a:
+            self._add_term(rat_fun.f, rat_fun.g)
         self.simplify()
 
+    @staticmethod
+    def canonical_denominator(g: Polynomial) -> Tuple[Polynomial, Rational]:
+        """Returns (G, s) with g = s * G, where G is primitive with positive leading coefficient"""
+        cont = gcd(*g.c) * (1 if g.c[-1] > 0 else -1)
+        return Polynomial.from_ints([x // cont for x in g.c]), Rational(cont, g.d)
+
+    def _add_term(self, f: Polynomial, g: Polynomial) -> None:
+        key, scale = RESum.canonical_denominator(g)
+        num = f * Rational(scale.q, scale.p)
+        if key in self.a:
+            num += self.a[key]
+        if not any(num.c):
+            self.a.pop(key, None)
+        else:
+            self.a[key] = num
+
     def sum_terms(self) -> RationalFunc:
-        res = cp(zero_rat_func)
-        for x in self:
-            res += x
-        return res
+        """Single rational function over the lcm of the denominators"""
+        if not self.a:
+            return cp(zero_rat_func)
+        denom = [1]
+        for key in self.a:
+            denom = poly_utils.poly_lcm(denom, key.c)
+        res = zero_poly
+        for key, num in self.a.items():
+            res += num * Polynomial.from_ints(poly_utils.exact_div(denom, key.c))
+        return RationalFunc(res, Polynomial.from_ints(denom))
 
     def simplify(self) -> None:
-        """Pairs up equal denominators"""
-        for i in reversed(range(len(self.a))):
-            self.a[i].simplify()
-            if self.a[i].f == zero_poly:
-                del self.a[i]
-                break
-            for j in range(i):
-                if self.a[i].g == self.a[j].g:
-                    self.a[j].f += self.a[i].f
-                    del self.a[i]
-                    break
+        """Enforce max_terms by merging everything into one term"""
+        if len(self.a) > self.max_terms:
+            res = self.sum_terms()
+            self.a.clear()
+            self._add_term(res.f, res.g)
+        RESum.peak_terms = max(RESum.peak_terms, len(self.a))
 
     def __add__(self, other: RES_T) -> RESum:
         return cp(self).__iadd__(other)
 
     def __iadd__(self, other: RES_T) -> RESum:
-        other = expr_utils.cast_up(other, RESum)
-        self.a += other.a
+        other = expr_utils.cast_up(other, RESum, read_only=True)
+        for rat_fun in other:
+            self._add_term(rat_fun.f, rat_fun.g)
+        self.simplify()
         return self
 
     def __sub__(self, other: RES_T) -> RESum:
@@ -51,13 +76,13 @@ class RESum:
 
     def __mul__(self, other: RES_T) -> RESum:
         if isinstance(other, RF_T):
-            return RESum([rat_fun * other for rat_fun in self.a])
+            return RESum([rat_fun * other for rat_fun in self])
         if isinstance(other, RESum):
             return RESum([self.sum_terms() * other.sum_terms()])
         raise NotImplementedError()
 
     def __call__(self, x: RAT_T) -> Optional[Rational]:
-        res = cp(zero_rational)
+        res = zero_rational
         for rat_fun in self:
             y = rat_fun(x)
             if y is None:
@@ -66,16 +91,13 @@ class RESum:
         return res
 
     def __iter__(self) -> Iterable[RationalFunc]:
-        return iter(self.a)
+        return (RationalFunc(num, key) for key, num in self.a.items())
 
     def __len__(self) -> int:
         return len(self.a)
 
     def __getitem__(self, item: int) -> RationalFunc:
-        return self.a[item]
-
-    def __setitem__(self, key: int, value: RationalFunc) -> None:
-        self.a[key] = value
+        return list(self)[item]
 
     def __repr__(self) -> str:
         return str(self)
@@ -84,12 +106,14 @@ class RESum:
         return " + ".join(f"{str(rat_fun)}" for rat_fun in self if rat_fun != zero_rat_func) or "0"
 
     def __eq__(self, o: RESum) -> bool:
-        o = expr_utils.cast_up(o, RESum, read_only=True)
-        return isinstance(o, RESum) and self.sum_terms() == o.sum_terms()
+        f = expr_utils.promotion(type(o), RESum)
+        if f is None:
+            return NotImplemented
+        return self.sum_terms() == f(o).sum_terms()
         
     def __deepcopy__(self, memodict={}):
         res = EmptyRESum()
-        res.a = [cp(x) for x in self.a]
+        res.a = dict(self.a)
         res.__class__ = RESum
         return res
 
@@ -102,3 +126,5 @@ one_REsum = RESum([cp(one_rat_func)])
 
 RES_T = Union[RF_T, RESum]
 _RES_T = *_RF_T, RESum
+
+expr_utils.register_promotion(RationalFunc, RESum, lambda x: RESum([x]))
@@ -0,0 +1,102 @@
+"""Real root isolation for integer polynomials via Descartes' rule of signs (Vincent-Collins-Akritas bisection)"""
+from typing import List, Tuple
+
+import poly_utils
+from poly_utils import INT_POLY
+from rational import Rational
+
+TAYLOR_SHIFT_THRESHOLD = 64  # longer polynomials are split in halves shifted with fast multiplication
+
+# x = (a t + b) / (c t + d), mapping t \in (0, \infty) onto the interval under inspection
+MOBIUS = Tuple[int, int, int, int]
+
+
+def descartes_bound(a: INT_POLY) -> int:
+    """Sign variations in the coefficients, an upper bound on the number of positive roots with the same parity"""
+    count, prev = 0, 0
+    for x in a:
+        if x:
+            if prev and (x > 0) != (prev > 0):
+                count += 1
+            prev = x
+    return count
+
+
+def _taylor_shift_small(a: INT_POLY, c: int) -> INT_POLY:
+    res = list(a)
+    for i in range(len(a) - 1):
+        for j in range(len(a) - 2, i - 1, -1):
+            res[j] += c * res[j + 1]
+    return res
+
+
+def taylor_shift(a: INT_POLY, c: int = 1) -> INT_POLY:
+    """a(x + c). Above TAYLOR_SHIFT_THRESHOLD coefficients, divide and conquer: with a = lo + x^m hi and m = 2^k,
+    a(x + c) = lo(x + c) + (x + c)^m hi(x + c), the powers (x + c)^(2^k) computed once by repeated squaring."""
+    if len(a) <= TAYLOR_SHIFT_THRESHOLD:
+        return _taylor_shift_small(a, c)
+    powers = [[c, 1]]
+    while 2 * len(powers[-1]) - 1 < len(a):
+        powers.append(poly_utils.mul(powers[-1], powers[-1]))
+
+    def shift(b: INT_POLY, k: int) -> INT_POLY:
+        if len(b) <= TAYLOR_SHIFT_THRESHOLD:
+            return _taylor_shift_small(b, c)
+        while len(powers[k]) > len(b):
+            k -= 1
+        m = len(powers[k]) - 1
+        return poly_utils.add(shift(b[:m], k), poly_utils.mul(powers[k], shift(b[m:], k)))
+
+    return shift(a, len(powers) - 1)
+
+
+def _strip_zero_root(a: INT_POLY) -> Tuple[INT_POLY, bool]:
+    """Divide out x if it divides a"""
+    if a[0] or not any(a):
+        return a, False
+    return a[1:], True
+
+
+def isolate_positive_roots(a: INT_POLY, mobius: MOBIUS = (1, 0, 0, 1)) -> List[Tuple[Rational, Rational]]:
+    """Isolating intervals for the distinct roots of a square-free a in (0, \\infty), mapped through mobius.
+    Open intervals (lo, hi) hold exactly one root; exact rational roots come back as (r, r)."""
+    ub = None
+    res = []
+    stack = [(a, mobius)]
+    while stack:
+        g, (m_a, m_b, m_c, m_d) = stack.pop()
+        v = descartes_bound(g)
+        if not v:
+            continue
+        if v == 1:
+            lo = Rational(m_b, m_d)
+            if m_c:
+                hi = Rational(m_a, m_c)
+            else:  # the interval runs off to infinity, cap it with a root bound of a
+                if ub is None:
+                    ub = Rational(max(map(abs, a[:-1]), default=0) + abs(a[-1]), abs(a[-1]))
+                hi = Rational(m_a * ub.p + m_b * ub.q, m_d * ub.q)
+            res.append((lo, hi) if lo < hi else (hi, lo))
+            continue
+        # split at t = 1: t -> t + 1 covers (1, \infty), t -> 1 / (t + 1) covers (0, 1)
+        right, at_one = _strip_zero_root(taylor_shift(g))
+        left, _ = _strip_zero_root(taylor_shift(g[::-1]))
+        if at_one:
+            root = Rational(m_a + m_b, m_c + m_d)
+            res.append((root, root))
+        stack.append((right, (m_a, m_a + m_b, m_c, m_c + m_d)))
+        stack.append((left, (m_b, m_a + m_b, m_d, m_c + m_d)))
+    return sorted(res, key=lambda interval: interval[0])
+
+
+def square_free_part(a: INT_POLY) -> INT_POLY:
+    g = poly_utils.poly_gcd(a, poly_utils.derivative(a))
+    return list(a) if len(g) == 1 else poly_utils.exact_div(a, g)
+
+
+def roots_above_1(a: INT_POLY) -> List[Tuple[Rational, Rational]]:
+    """Isolating intervals (as in isolate_positive_roots) for the distinct real roots of a in (1, \\infty)"""
+    if len(a) <= 1:
+        return []
+    shifted, _ = _strip_zero_root(taylor_shift(square_free_part(a)))
+    return isolate_positive_roots(shifted, (1, 1, 0, 1))
@@ -0,0 +1,48 @@
+"""Cheap refutation of pos_above_1: evaluate many polynomials on a grid of \\lambda > 1 in float64, then confirm the
+most negative value exactly"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from polynomial import Polynomial
+from rational import Rational
+
+# dyadic, so every grid point is exact both as a float and as a Rational
+DEFAULT_GRID = (1.0625, 1.125, 1.25, 1.5, 2.0, 3.0, 5.0, 9.0, 17.0, 33.0)
+FLOAT_BITS = 60  # coefficients are shifted down to about this many bits before conversion to float64
+
+
+def _float_coefficients(polys: Sequence[Polynomial]) -> np.ndarray:
+    """Row k holds the coefficients of polys[k] scaled into float64 range, right-aligned so the leading ones line up"""
+    width = max(len(f.c) for f in polys)
+    res = np.zeros((len(polys), width))
+    for k, f in enumerate(polys):
+        shift = max(max(abs(x) for x in f.c).bit_length() - FLOAT_BITS, 0)
+        res[k, width - len(f.c):] = [x >> shift for x in f.c]
+    return res
+
+
+def screen(polys: Sequence[Polynomial], grid: Sequence[float] = DEFAULT_GRID) -> List[Optional[Rational]]:
+    """For each nonzero f, a \\lambda in grid with f(\\lambda) <= 0 (so not f.pos_above_1()), or None if the grid
+    finds none. Candidates come from float64 and are always confirmed exactly."""
+    res: List[Optional[Rational]] = [None] * len(polys)
+    if not polys:
+        return res
+    C = _float_coefficients(polys)
+    x = 1 / np.asarray(grid, dtype=np.float64)
+    # sum_i c_i (1 / \lambda)^(deg - i) = f(\lambda) / \lambda^deg by Horner, which has f's sign and never overflows
+    vals = np.zeros((len(polys), len(grid)))
+    for col in range(C.shape[1]):
+        vals = vals * x + C[:, col:col + 1]
+    order = np.argsort(vals, axis=1)
+    for k, f in enumerate(polys):
+        if not any(f.c):
+            continue
+        for g in order[k]:
+            if vals[k, g] > 0:
+                break
+            lambd = Rational(*float(grid[g]).as_integer_ratio())
+            if f(lambd) <= 0:
+                res[k] = lambd
+                break
+    return res
@@ -0,0 +1,251 @@
+"""Compact binary format for the numeric tower (int, Rational, Polynomial, RationalFunc, RESum, PolyMatrix) and for
+files holding matrices of RESum, which can be read lazily row by row through mmap"""
+from __future__ import annotations
+import mmap
+import struct
+from typing import Iterator, List, Tuple, Union
+
+from polynomial import Polynomial
+from poly_matrix import PolyMatrix
+from rational import Rational
+from rational_func import RationalFunc
+from re_sum import RESum, EmptyRESum
+
+SMALL_BITS = 56  # integers below 2^56 (after zigzag) are plain varints, bigger ones are length-prefixed bytes
+
+_INT, _RATIONAL, _POLYNOMIAL, _RATIONAL_FUNC, _RE_SUM, _POLY_MATRIX = range(6)
+
+MATRIX_MAGIC = b"RESM"
+MATRIX_VERSION = 1
+# magic, version, rows, cols, offset of the denominator table, offset of the row index
+_MATRIX_HEADER = struct.Struct("<4sBIIQQ")
+_OFFSET = struct.Struct("<Q")
+
+SERIALIZABLE_T = Union[int, Rational, Polynomial, RationalFunc, RESum, PolyMatrix]
+
+
+def _write_varint(buf: bytearray, x: int) -> None:
+    while x > 0x7F:
+        buf.append(x & 0x7F | 0x80)
+        x >>= 7
+    buf.append(x)
+
+
+def _read_varint(data, pos: int) -> Tuple[int, int]:
+    res = shift = 0
+    while 1:
+        b = data[pos]
+        pos += 1
+        res |= (b & 0x7F) << shift
+        if b < 0x80:
+            return res, pos
+        shift += 7
+
+
+def write_int(buf: bytearray, x: int) -> None:
+    """Zigzag x, then a varint 2z for small z or 2 len + 1 followed by len little-endian bytes"""
+    z = x << 1 if x >= 0 else ((-x) << 1) - 1
+    if z.bit_length() <= SMALL_BITS:
+        _write_varint(buf, z << 1)
+    else:
+        n = (z.bit_length() + 7) >> 3
+        _write_varint(buf, n << 1 | 1)
+        buf += z.to_bytes(n, "little")
+
+
+def read_int(data, pos: int) -> Tuple[int, int]:
+    h, pos = _read_varint(data, pos)
+    if h & 1:
+        n = h >> 1
+        z, pos = int.from_bytes(data[pos:pos + n], "little"), pos + n
+    else:
+        z = h >> 1
+    return (z >> 1) if not z & 1 else -((z + 1) >> 1), pos
+
+
+def write_polynomial(buf: bytearray, f: Polynomial) -> None:
+    _write_varint(buf, len(f.c))
+    for x in f.c:
+        write_int(buf, x)
+    write_int(buf, f.d)
+
+
+def read_polynomial(data, pos: int) -> Tuple[Polynomial, int]:
+    n, pos = _read_varint(data, pos)
+    c = []
+    for _ in range(n):
+        x, pos = read_int(data, pos)
+        c.append(x)
+    d, pos = read_int(data, pos)
+    return Polynomial.from_ints(c, d), pos
+
+
+def _write_re_sum(buf: bytearray, x: RESum, table: dict) -> None:
+    """Terms as (index of the denominator in table, numerator); new denominators are added to table"""
+    _write_varint(buf, len(x.a))
+    for key, num in x.a.items():
+        _write_varint(buf, table.setdefault(key, len(table)))
+        write_polynomial(buf, num)
+
+
+def _read_re_sum(data, pos: int, table: List[Polynomial]) -> Tuple[RESum, int]:
+    n, pos = _read_varint(data, pos)
+    res = EmptyRESum()
+    res.a = {}
+    for _ in range(n):
+        idx, pos = _read_varint(data, pos)
+        num, pos = read_polynomial(data, pos)
+        res.a[table[idx]] = num  # keys were canonical when written
+    res.__class__ = RESum
+    return res, pos
+
+
+def _write(buf: bytearray, x: SERIALIZABLE_T) -> None:
+    if isinstance(x, int):
+        buf.append(_INT)
+        write_int(buf, x)
+    elif isinstance(x, Rational):
+        buf.append(_RATIONAL)
+        write_int(buf, x.p)
+        write_int(buf, x.q)
+    elif isinstance(x, Polynomial):
+        buf.append(_POLYNOMIAL)
+        write_polynomial(buf, x)
+    elif isinstance(x, RationalFunc):
+        buf.append(_RATIONAL_FUNC)
+        write_polynomial(buf, x.f)
+        write_polynomial(buf, x.g)
+    elif isinstance(x, RESum):
+        buf.append(_RE_SUM)
+        body, table = bytearray(), {}
+        _write_re_sum(body, x, table)
+        _write_varint(buf, len(table))
+        for key in table:
+            write_polynomial(buf, key)
+        buf += body
+    elif isinstance(x, PolyMatrix):
+        buf.append(_POLY_MATRIX)
+        _write_varint(buf, len(x.num))
+        _write_varint(buf, len(x.num[0]) if x.num else 0)
+        for row, g in zip(x.num, x.den):
+            write_polynomial(buf, g)
+            for f in row:
+                write_polynomial(buf, f)
+    else:
+        raise TypeError(f"can't serialize {type(x).__name__}")
+
+
+def _read(data, pos: int) -> Tuple[SERIALIZABLE_T, int]:
+    tag, pos = data[pos], pos + 1
+    if tag == _INT:
+        return read_int(data, pos)
+    if tag == _RATIONAL:
+        p, pos = read_int(data, pos)
+        q, pos = read_int(data, pos)
+        return Rational(p, q), pos
+    if tag == _POLYNOMIAL:
+        return read_polynomial(data, pos)
+    if tag == _RATIONAL_FUNC:
+        f, pos = read_polynomial(data, pos)
+        g, pos = read_polynomial(data, pos)
+        return RationalFunc(f, g), pos
+    if tag == _RE_SUM:
+        n, pos = _read_varint(data, pos)
+        table = []
+        for _ in range(n):
+            key, pos = read_polynomial(data, pos)
+            table.append(key)
+        return _read_re_sum(data, pos, table)
+    if tag == _POLY_MATRIX:
+        rows, pos = _read_varint(data, pos)
+        cols, pos = _read_varint(data, pos)
+        num, den = [], []
+        for _ in range(rows):
+            g, pos = read_polynomial(data, pos)
+            row = []
+            for _ in range(cols):
+                f, pos = read_polynomial(data, pos)
+                row.append(f)
+            num.append(row)
+            den.append(g)
+        return PolyMatrix(num, den), pos
+    raise ValueError(f"unknown tag {tag}")
+
+
+def dumps(x: SERIALIZABLE_T) -> bytes:
+    buf = bytearray()
+    _write(buf, x)
+    return bytes(buf)
+
+
+def loads(data: bytes) -> SERIALIZABLE_T:
+    return _read(data, 0)[0]
+
+
+def write_matrix(path: str, A: List[List[RESum]]) -> None:
+    """Header, rows, one table of every distinct denominator in A, then the offset of each row"""
+    table, offsets = {}, []
+    with open(path, "wb") as f:
+        f.write(bytes(_MATRIX_HEADER.size))
+        pos = _MATRIX_HEADER.size
+        for row in A:
+            buf = bytearray()
+            for entry in row:
+                _write_re_sum(buf, entry, table)
+            offsets.append(pos)
+            f.write(buf)
+            pos += len(buf)
+        offsets.append(pos)
+        buf = bytearray()
+        _write_varint(buf, len(table))
+        for key in table:
+            write_polynomial(buf, key)
+        f.write(buf)
+        index_offset = pos + len(buf)
+        for offset in offsets:
+            f.write(_OFFSET.pack(offset))
+        f.seek(0)
+        f.write(_MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, len(A), len(A[0]) if A else 0, pos, index_offset))
+
+
+class MatrixReader:
+    """A matrix written by write_matrix, mapped into memory; rows are only decoded when indexed"""
+    __slots__ = ["rows", "cols", "table", "_file", "_map", "_index"]
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, table_offset, self._index = _MATRIX_HEADER.unpack_from(self._map, 0)
+        if magic != MATRIX_MAGIC or version != MATRIX_VERSION:
+            raise ValueError(f"{path} is not a version {MATRIX_VERSION} RESum matrix")
+        n, pos = _read_varint(self._map, table_offset)
+        self.table = []
+        for _ in range(n):
+            key, pos = read_polynomial(self._map, pos)
+            self.table.append(key)
+
+    def __getitem__(self, item: int) -> List[RESum]:
+        if not 0 <= item < self.rows:
+            raise IndexError(item)
+        (pos,) = _OFFSET.unpack_from(self._map, self._index + item * _OFFSET.size)
+        row = []
+        for _ in range(self.cols):
+            entry, pos = _read_re_sum(self._map, pos, self.table)
+            row.append(entry)
+        return row
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __iter__(self) -> Iterator[List[RESum]]:
+        return (self[i] for i in range(self.rows))
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> MatrixReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+from copy import deepcopy as cp
+from typing import Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SparseMatrix(Generic[T]):
+    """Compressed sparse rows: row i has data[indptr[i]:indptr[i + 1]] in columns indices[indptr[i]:indptr[i + 1]],
+    and every other entry is zero"""
+    __slots__ = ["shape", "indptr", "indices", "data", "zero"]
+
+    def __init__(self, shape: Tuple[int, int], indptr: List[int], indices: List[int], data: List[T], zero: T) -> None:
+        self.shape, self.indptr, self.indices, self.data, self.zero = shape, indptr, indices, data, zero
+
+    @staticmethod
+    def from_rows(rows: List[Dict[int, T]], cols: int, zero: T) -> SparseMatrix[T]:
+        """From one {column: entry} dict per row"""
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for j in sorted(row):
+                indices.append(j)
+                data.append(row[j])
+            indptr.append(len(indices))
+        return SparseMatrix((len(rows), cols), indptr, indices, data, zero)
+
+    @staticmethod
+    def from_dense(A: List[List[T]], zero: T, is_zero: Callable[[T], bool]) -> SparseMatrix[T]:
+        return SparseMatrix.from_rows(
+            [{j: x for j, x in enumerate(row) if not is_zero(x)} for row in A], len(A[0]) if A else 0, zero
+        )
+
+    def row(self, i: int) -> List[Tuple[int, T]]:
+        """The nonzeros of row i as (column, entry)"""
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return list(zip(self.indices[lo:hi], self.data[lo:hi]))
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def map(self, f: Callable[[T], T], zero: Optional[T] = None) -> SparseMatrix[T]:
+        """f applied to every stored entry, e.g. evaluation at a point; zero is f(self.zero) if not given"""
+        return SparseMatrix(
+            self.shape, self.indptr, self.indices, [f(x) for x in self.data], f(self.zero) if zero is None else zero
+        )
+
+    def __mul__(self, other: SparseMatrix[T]) -> SparseMatrix[T]:
+        """Row-by-row (Gustavson) product; only pairs of nonzeros are ever multiplied. Sums that cancel stay stored."""
+        rows = []
+        for i in range(self.shape[0]):
+            acc: Dict[int, T] = {}
+            for j, a in self.row(i):
+                for k, b in other.row(j):
+                    if k in acc:
+                        acc[k] += a * b
+                    else:
+                        acc[k] = a * b
+            rows.append(acc)
+        return SparseMatrix.from_rows(rows, other.shape[1], self.zero)
+
+    def matvec(self, v: List[T]) -> List[T]:
+        """A v"""
+        res = []
+        for i in range(self.shape[0]):
+            acc = cp(self.zero)
+            for j, a in self.row(i):
+                acc += a * v[j]
+            res.append(acc)
+        return res
+
+    def to_dense(self) -> List[List[T]]:
+        return list(self)
+
+    def __getitem__(self, item: int) -> List[T]:
+        """Row item, zeros included; each zero is its own copy, so in-place updates of the row can't reach self.zero"""
+        res = [cp(self.zero) for _ in range(self.shape[1])]
+        for j, x in self.row(item):
+            res[j] = x
+        return res
+
+    def __iter__(self) -> Iterator[List[T]]:
+        return (self[i] for i in range(self.shape[0]))
+
+    def __len__(self) -> int:
+        return self.shape[0]
@@ -1,14 +1,89 @@
-from typing import Tuple, List
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Tuple
 
-State = Tuple[int, int, int]
+State = Tuple[int, ...]  # (blue, c_1, ..., c_{q - 1}) with c_1 >= ... >= c_{q - 1}
 
 
-def get_states(n: int) -> List[State]:
-    states = []
-    for blue in range(0, n + 1):
-        for stars in range(0, n + 1 - blue):
-            daggers = n - blue - stars
-            if daggers > stars:
-                continue
-            states.append((blue, stars, daggers))
-    return [*reversed(sorted(states))]
+class StateSpace:
+    """States of the q-color chain on n vertices, in descending lexicographic order. The non-blue colors are
+    interchangeable, so their counts form a partition. rank and unrank take O(q) lookups in tables of partition
+    counts (unrank binary searches each count), so the states never have to be listed."""
+    __slots__ = ["n", "q", "_count", "_offset", "_starts"]
+
+    def __init__(self, n: int, q: int = 3) -> None:
+        self.n, self.q = n, q
+        # _count[k][m][b]: non-increasing sequences of k counts in [0, b] summing to m
+        self._count = [[[int(not m)] * (n + 1) for m in range(n + 1)]]
+        for _ in range(q - 1):
+            prev = self._count[-1]
+            table = []
+            for m in range(n + 1):
+                row, acc = [], 0
+                for b in range(n + 1):
+                    if b <= m:
+                        acc += prev[m - b][b]
+                    row.append(acc)
+                table.append(row)
+            self._count.append(table)
+        # _offset[blue]: states with more than blue blue vertices, all of which come first
+        self._offset = [0] * (n + 2)
+        for blue in range(n - 1, -1, -1):
+            self._offset[blue] = self._offset[blue + 1] + self._block(blue + 1)
+        self._starts = self._offset[n::-1]  # increasing, _starts[i] = _offset[n - i]
+
+    def _block(self, blue: int) -> int:
+        m = self.n - blue
+        return self._count[self.q - 1][m][m]
+
+    def rank(self, x: State) -> int:
+        """Position of x: the states before it share a prefix with it and are bigger in the next count"""
+        m = self.n - x[0]
+        res, bound = self._offset[x[0]], m
+        for k, v in zip(range(self.q - 1, 0, -1), x[1:]):
+            table = self._count[k][m]
+            res += table[bound] - table[v]
+            m, bound = m - v, v
+        return res
+
+    def unrank(self, r: int) -> State:
+        if not 0 <= r < len(self):
+            raise IndexError(r)
+        blue = self.n - bisect_right(self._starts, r) + 1
+        r -= self._offset[blue]
+        m = bound = self.n - blue
+        res = [blue]
+        for k in range(self.q - 1, 0, -1):
+            table = self._count[k][m]
+            v = bisect_left(table, table[bound] - r, 0, bound + 1)
+            r -= table[bound] - table[v]
+            res.append(v)
+            m, bound = m - v, v
+        return tuple(res)
+
+    def _partitions(self, m: int, k: int, bound: int) -> Iterator[State]:
+        if not k:
+            if not m:
+                yield ()
+            return
+        for v in range(min(m, bound), -1, -1):
+            if self._count[k - 1][m - v][v]:
+                for rest in self._partitions(m - v, k - 1, v):
+                    yield v, *rest
+
+    def __iter__(self) -> Iterator[State]:
+        for blue in range(self.n, -1, -1):
+            for rest in self._partitions(self.n - blue, self.q - 1, self.n - blue):
+                yield blue, *rest
+
+    def __len__(self) -> int:
+        return self._offset[0] + self._block(0)
+
+    def __getitem__(self, item: int) -> State:
+        return self.unrank(item)
+
+    def index(self, x: State) -> int:
+        return self.rank(x)
+
+
+def get_states(n: int, q: int = 3) -> List[State]:
+    return list(StateSpace(n, q))
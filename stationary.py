@@ -0,0 +1,210 @@
+"""Exact stationary distribution of the transition matrix: the \\pi with \\pi A = \\pi and entries summing to 1, as
+rational functions of \\lambda. Solved by fraction-free (Bareiss) elimination over Z[\\lambda] on the sparse system with
+Markowitz pivoting against fill-in, or by the same elimination over Z at integer points followed by interpolation."""
+import operator
+from collections import Counter
+from itertools import count
+from math import lcm
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Union
+
+import poly_utils
+from matrix_utils import generate_poly_transition_matrix
+from poly_matrix import PolyMatrix
+from poly_utils import INT_POLY
+from polynomial import Polynomial, one_poly, zero_poly
+from rational_func import RationalFunc
+from re_sum import RESum
+
+SPARSE_ROW = Dict[int, Any]  # column -> nonzero entry
+
+
+class _Ring(NamedTuple):
+    """What the elimination needs of its entries: Z[\\lambda] as stripped INT_POLY for the symbolic solve, plain ints at
+    points. div is only ever called on exact quotients, and size ranks entries for pivoting."""
+    zero: Any
+    one: Any
+    add: Callable[[Any, Any], Any]
+    sub: Callable[[Any, Any], Any]
+    mul: Callable[[Any, Any], Any]
+    div: Callable[[Any, Any], Any]
+    size: Callable[[Any], Tuple[int, int]]
+
+
+def _system(A: PolyMatrix) -> Tuple[List[SPARSE_ROW], List[INT_POLY]]:
+    """One integer equation per column j of A, sum_i x_i N[i][j] = 0, where N[i] = c_i (A[i] - e_i) and c_i is den[i]
+    times the least integer clearing coefficient denominators; \\pi_i is then proportional to c_i x_i"""
+    eqs: List[SPARSE_ROW] = [{} for _ in A.num]
+    scale = []
+    for i, (row, g) in enumerate(zip(A.num, A.den)):
+        row = [f - g if j == i else f for j, f in enumerate(row)]
+        m = lcm(g.d, *(f.d for f in row))
+        for j, f in enumerate(row):
+            if f is not zero_poly:
+                eqs[j][i] = [x * (m // f.d) for x in f.c]
+        scale.append([x * (m // g.d) for x in g.c])
+    return eqs, scale
+
+
+def _div(a: INT_POLY, b: INT_POLY) -> INT_POLY:
+    if b == [1]:
+        return a
+    q = poly_utils.exact_div(a, b)
+    if q is None:
+        raise ArithmeticError("inexact division in fraction-free elimination")
+    return q
+
+
+_POLYNOMIALS = _Ring(
+    [0], [1], poly_utils.add, lambda a, b: poly_utils.add(a, b, 1, -1), poly_utils.mul, _div,
+    lambda a: (len(a), max(map(abs, a)).bit_length()),
+)
+_INTEGERS = _Ring(0, 1, operator.add, operator.sub, operator.mul, operator.floordiv, lambda a: (1, a.bit_length()))
+
+
+def _parity(perm: List[int]) -> int:
+    """Sign of the permutation sorting perm"""
+    sign = 1
+    for i, x in enumerate(perm):
+        for y in perm[i + 1:]:
+            if y < x:
+                sign = -sign
+    return sign
+
+
+def _markowitz(rows: List[SPARSE_ROW], free: int, ring: _Ring) -> Tuple[int, int]:
+    """(row, column) of the nonzero outside column free with the least Markowitz count (r - 1)(c - 1), which bounds
+    the fill-in of pivoting on it; ties go to the lowest degree, then the smallest coefficients"""
+    col_counts = Counter(j for row in rows for j in row)
+    best, res = None, None
+    for k, row in enumerate(rows):
+        for j, a in row.items():
+            if j != free:
+                key = (len(row) - 1) * (col_counts[j] - 1), *ring.size(a)
+                if best is None or key < best:
+                    best, res = key, (k, j)
+    if res is None:
+        raise ZeroDivisionError("singular system")
+    return res
+
+
+def _eliminate(eqs: List[SPARSE_ROW], free: int, ring: _Ring) -> Tuple[List[Tuple[SPARSE_ROW, int]], int]:
+    """Bareiss elimination of every unknown but free. Returns the pivot rows, each with its pivot column, in order,
+    and the sign of the row and column permutations the pivoting amounts to: the last pivot times it is the
+    determinant of the system with column free removed."""
+    rows = [(k, dict(row)) for k, row in enumerate(eqs)]
+    prev = ring.one
+    pivots, row_order, col_order = [], [], []
+    while rows:
+        k, j = _markowitz([row for _, row in rows], free, ring)
+        idx, piv = rows.pop(k)
+        p = piv[j]
+        for n, (i, row) in enumerate(rows):
+            # the Bareiss step a_ic <- (p a_ic - a_ij piv_c) / prev, on every remaining row
+            a = row.pop(j, None)
+            new = {c: ring.mul(p, v) for c, v in row.items()}
+            if a is not None:
+                for c, v in piv.items():
+                    if c != j:
+                        new[c] = ring.sub(new.get(c, ring.zero), ring.mul(a, v))
+            rows[n] = i, {c: ring.div(v, prev) for c, v in new.items() if v != ring.zero}
+        pivots.append((piv, j))
+        row_order.append(idx)
+        col_order.append(j)
+        prev = p
+    return pivots, _parity(row_order) * _parity(col_order)
+
+
+def _solve(eqs: List[SPARSE_ROW], free: int, ring: _Ring = _POLYNOMIALS) -> Dict[int, Any]:
+    """The solution with x_free the determinant of the system without column free, which makes every x_i a
+    polynomial (Cramer), by back-substitution through the pivot rows"""
+    pivots, sign = _eliminate(eqs, free, ring)
+    det = pivots[-1][0][pivots[-1][1]] if pivots else ring.one
+    x = {free: det if sign > 0 else ring.sub(ring.zero, det)}
+    for row, j in reversed(pivots):
+        acc = ring.zero
+        for c, v in row.items():
+            if c != j:
+                acc = ring.sub(acc, ring.mul(v, x[c]))
+        x[j] = ring.div(acc, row[j])
+    return x
+
+
+def _at(a: INT_POLY, t: int) -> int:
+    res = 0
+    for x in reversed(a):
+        res = res * t + x
+    return res
+
+
+def _interpolate(ts: List[int], ys: List[int]) -> INT_POLY:
+    """The integer polynomial of degree < len(ts) through the points (t, y), by Newton's divided differences; those of
+    an integer polynomial at integer nodes are integers, so every division is exact"""
+    coeffs = list(ys)
+    for k in range(1, len(ts)):
+        for i in range(len(ts) - 1, k - 1, -1):
+            coeffs[i] = (coeffs[i] - coeffs[i - 1]) // (ts[i] - ts[i - k])
+    res = [0]
+    for t, a in zip(reversed(ts), reversed(coeffs)):
+        # res <- res (x - t) + a
+        res = [a - t * res[0]] + [res[i - 1] - t * res[i] for i in range(1, len(res))] + [res[-1]]
+    return poly_utils.strip(res)
+
+
+def _solve_by_interpolation(eqs: List[SPARSE_ROW], free: int) -> Dict[int, INT_POLY]:
+    """_solve(eqs, free), from solutions over Z at t = 0, 1, ...; points where the system is singular are skipped.
+    Every x_i is a maximal minor of the system, so its degree is at most the sum of the largest degree in each
+    equation, and at most the sum of the largest degree in each column but the one it drops."""
+    col_degrees = Counter()
+    for row in eqs:
+        for c, a in row.items():
+            col_degrees[c] = max(col_degrees[c], len(a) - 1)
+    bound = min(
+        sum(max((len(a) - 1 for a in row.values()), default=0) for row in eqs),
+        sum(col_degrees.values()) - min(col_degrees[c] for c in range(len(eqs) + 1)),
+    )
+    ts, values = [], []
+    for t in count():
+        if len(ts) > bound:
+            break
+        at_t = [{c: y for c, y in ((c, _at(a, t)) for c, a in row.items()) if y} for row in eqs]
+        try:
+            x = _solve(at_t, free, _INTEGERS)
+        except ZeroDivisionError:
+            continue
+        ts.append(t)
+        values.append(x)
+    return {i: _interpolate(ts, [x[i] for x in values]) for i in values[0]}
+
+
+def stationary_distribution_of(
+    A: Union[PolyMatrix, List[List[RESum]]], interpolate: bool = False
+) -> List[RationalFunc]:
+    """\\pi with \\pi A = \\pi and entries summing to 1, each in lowest terms over a monic denominator, for the
+    transition matrix A of an irreducible chain; interpolate solves at integer points instead of over Z[\\lambda]"""
+    if not isinstance(A, PolyMatrix):
+        A = PolyMatrix.from_resum(A)
+    eqs, scale = _system(A)
+    s = len(eqs)
+    # the rows of A sum to 1, so the equations sum to zero and the last one is redundant; x_{s - 1} is left free
+    try:
+        x = (_solve_by_interpolation if interpolate else _solve)(eqs[:-1], s - 1)
+    except ZeroDivisionError:
+        raise ValueError("the chain has no unique stationary distribution") from None
+    num = [poly_utils.mul(c, x[i]) for i, c in enumerate(scale)]
+    total = [0]
+    for f in num:
+        total = poly_utils.add(total, f)
+    res = []
+    for f in num:
+        if not any(f):
+            res.append(RationalFunc(zero_poly, one_poly))
+            continue
+        g = poly_utils.poly_gcd(f, total)
+        f, h = poly_utils.exact_div(f, g), poly_utils.exact_div(total, g)
+        res.append(RationalFunc(Polynomial.from_ints(f, h[-1]), Polynomial.from_ints(h, h[-1])))
+    return res
+
+
+def stationary_distribution(n: int, interpolate: bool = False, q: int = 3) -> List[RationalFunc]:
+    """Stationary distribution of the q-color chain on n vertices, indexed like StateSpace(n, q)"""
+    return stationary_distribution_of(generate_poly_transition_matrix(n, q), interpolate)
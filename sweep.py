@@ -0,0 +1,86 @@
+"""Float64 engine for sweeps over many \\lambda at once: the transition matrices as a (len(\\lambda), s, s) tensor built
+straight from the StateSpace, batched powers, k-step distributions and spectral gaps. Meant for exploring which state
+pairs look ordered before certifying them exactly; nothing here is exact."""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from states import StateSpace
+
+ORDER_TOL = 1e-12  # differences above -ORDER_TOL count as nonnegative in sweep_partial_ordering
+
+
+def _moves(space: StateSpace) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(idx_x, idx_y, w, e, tot) over every move x -> y, which has probability w \\lambda^e / sum_d \\lambda^tot[d],
+    mirroring matrix_utils.transition_row"""
+    idx_x, idx_y, w, e, tot = [], [], [], [], []
+    for i, x in enumerate(space):
+        for src in range(space.q):
+            if not x[src]:
+                continue
+            exps = [cnt - (dst == src) for dst, cnt in enumerate(x)]
+            for dst in range(space.q):
+                y = [cnt - (c == src) + (c == dst) for c, cnt in enumerate(x)]
+                idx_x.append(i)
+                idx_y.append(space.rank((y[0], *sorted(y[1:], reverse=True))))
+                w.append(x[src] / space.n)
+                e.append(exps[dst])
+                tot.append(exps)
+    return np.array(idx_x), np.array(idx_y), np.array(w), np.array(e), np.array(tot)
+
+
+def transition_tensor(n: int, lambdas: Sequence[float], q: int = 3) -> np.ndarray:
+    """P[l] is the transition matrix of the q-color chain on n vertices at lambdas[l] > 0, indexed like StateSpace"""
+    lambd = np.asarray(lambdas, dtype=np.float64)[:, None]
+    space = StateSpace(n, q)
+    idx_x, idx_y, w, e, tot = _moves(space)
+    # scale numerator and denominator by \lambda^-max (\lambda^-min below 1) so no power overflows
+    ref = np.where(lambd >= 1, tot.max(axis=1), tot.min(axis=1))
+    den = (lambd[:, :, None] ** (tot - ref[:, :, None])).sum(axis=2)
+    prob = w * lambd ** (e - ref) / den
+    s = len(space)
+    P = np.zeros((len(lambd), s * s))
+    for k in range(len(w)):  # at most q^2 s moves, each a vectorized update over every \lambda
+        P[:, idx_x[k] * s + idx_y[k]] += prob[:, k]
+    return P.reshape(len(lambd), s, s)
+
+
+def matrix_powers(P: np.ndarray, k: int) -> np.ndarray:
+    """P^k for every matrix in the stack, by repeated squaring"""
+    return np.linalg.matrix_power(P, k)
+
+
+def iterate_column(P: np.ndarray, steps: int, column: int = 0) -> np.ndarray:
+    """U[k - 1] = P^k e_column for k = 1, ..., steps, for every matrix in the stack: shape (steps, len(P), s)"""
+    u = np.zeros(P.shape[:2])
+    u[:, column] = 1
+    res = []
+    for _ in range(steps):
+        u = np.einsum("lij,lj->li", P, u)
+        res.append(u)
+    return np.stack(res) if res else np.zeros((0, *P.shape[:2]))
+
+
+def distributions(P: np.ndarray, steps: int, start: int = 0) -> np.ndarray:
+    """D[k - 1] = e_start^T P^k, the distribution after k steps from state start, for k = 1, ..., steps"""
+    return iterate_column(np.swapaxes(P, 1, 2), steps, start)
+
+
+def spectral_gap(P: np.ndarray) -> np.ndarray:
+    """1 - |\\mu_2| for every matrix in the stack, \\mu_2 its second largest eigenvalue in modulus"""
+    mods = np.sort(np.abs(np.linalg.eigvals(P)), axis=1)
+    return 1 - mods[:, -2]
+
+
+def sweep_partial_ordering(
+    n: int, lambdas: Sequence[float], steps: int = 3, tol: float = ORDER_TOL, q: int = 3
+) -> List[List[bool]]:
+    """Float prediction of get_max_partial_ordering(n, steps) from samples of \\lambda > 1: r[j][i] becomes False once
+    some P^k e_0 has entry i at least entry j at every sample"""
+    U = iterate_column(transition_tensor(n, lambdas, q), steps)
+    s = U.shape[2]
+    r = np.ones((s, s), dtype=bool)
+    for u in U:
+        # diff[l, i, j] = u_i - u_j at lambdas[l]
+        r &= ~(u[:, :, None] - u[:, None, :] > -tol).all(axis=0).T
+    return r.tolist()
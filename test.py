@@ -97,4 +97,349 @@ class TestExpression:
         f = a_1 * a_2 * a_2 * a_5 * a_5 * a_5 * a_5 * a_5
         assert f.yun_factorization() == [a_1, a_2, one_poly, one_poly, a_5]
 
-    
\ No newline at end of file
+    
+    def test_divmod(self):
+        f = Polynomial([Rational(1, 2), 0, Rational(3, 4), 5])
+        g = Polynomial([Rational(-2, 3), 1])
+        q, r = divmod(f, g)
+        assert q * g + r == f
+        assert len(r) == 1
+        assert (f.c, f.d) == ((2, 0, 3, 20), 4)
+        assert Polynomial([Rational(2, 4), Rational(6, 4)]).d == 2
+
+    def test_fast_mul(self):
+        import poly_utils
+        a = [(-1) ** i * (i * 7919) ** 3 for i in range(80)]
+        b = [3 - i if i % 5 else 2 ** 200 for i in range(90)]
+        ab = poly_utils.schoolbook_mul(a, b)
+        assert poly_utils.kronecker_mul(a, b) == ab
+        assert poly_utils.karatsuba_mul(a, b) == ab
+        assert poly_utils.exact_div(ab, b) == a
+        assert poly_utils.exact_div([x + 1 for x in ab], b) is None
+        c = [5, -3, 0, 6]  # below EXACT_DIV_THRESHOLD, lc not a unit
+        assert poly_utils.exact_div(poly_utils.mul(a, c), c) == a and poly_utils.exact_div(a, [1, 2]) is None
+        assert poly_utils.exact_div(poly_utils.mul(a, c)[:-1] + [7], c) is None
+
+    def test_gcd(self):
+        import poly_utils
+        g = [3, -1, 0, 4, 2, 7, -5, 1, 1, 9]
+        a = poly_utils.mul(g, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
+        b = poly_utils.mul(poly_utils.mul(g, g), [-6, 0, 0, 0, 0, 0, 0, 0, 0, 1])
+        assert poly_utils.subresultant_gcd(a, b) == g
+        assert poly_utils.modular_gcd(a, b) == g
+        assert Polynomial([2, 2]).gcd(Polynomial([-2, 0, 2])) == Polynomial([1, 1])
+
+    def test_root_isolation(self):
+        import root_isolation
+        f = Polynomial([-2, 1]) * Polynomial([-3, 2]) * Polynomial([-7, 0, 3]) * Polynomial([1, 1])
+        intervals = root_isolation.roots_above_1(f.c)
+        assert len(intervals) == 3
+        assert (Rational(3, 2), Rational(3, 2)) in intervals and (Rational(2, 1), Rational(2, 1)) in intervals
+        assert not f.pos_above_1()
+        assert (Polynomial([-1, 1]) * Polynomial([1, 0, 1])).pos_above_1()
+        assert not (Polynomial([-2, 1]) * Polynomial([-2, 1])).pos_above_1()
+        a = [(-1) ** i * (i % 7 + 1) for i in range(3 * root_isolation.TAYLOR_SHIFT_THRESHOLD + 5)]
+        for c in 1, -2:
+            assert root_isolation.taylor_shift(a, c) == root_isolation._taylor_shift_small(a, c)
+
+    def test_re_sum(self):
+        g = Polynomial([1, 1, 1])
+        res = RESum([RationalFunc(one_poly, g), RationalFunc(Polynomial([3]), g * -2)])
+        res += RationalFunc(Polynomial([0, 1]), g * Rational(1, 2))
+        assert len(res) == 1
+        assert res.sum_terms() == RationalFunc(Polynomial([-1, 4]), g * 2)
+        old_max, RESum.max_terms = RESum.max_terms, 2
+        res = RESum([RationalFunc(one_poly, Polynomial([k, 1])) for k in range(1, 5)])
+        RESum.max_terms = old_max
+        assert len(res) == 1
+        assert res(1) == Rational(1, 2) + Rational(1, 3) + Rational(1, 4) + Rational(1, 5)
+
+    def test_hashable(self):
+        assert Rational(2, -4) == Rational(-1, 2) and hash(Rational(2, -4)) == hash(Rational(-1, 2))
+        assert Rational(0, 5) is zero_rational and Rational(3, 3) is one_rational
+        assert Polynomial([Rational(1, 2)]) * 2 is one_poly
+        assert hash(Polynomial([3])) == hash(3) == hash(Rational(6, 2))
+        assert len({Polynomial([1, 2]), Polynomial([Rational(2, 2), 2]), Polynomial.monomial(1)}) == 2
+        assert Rational(3) == Polynomial([3]) and Polynomial([3]) == Rational(3) and Rational(1, 2) != Polynomial([1])
+        assert len({Rational(3), Polynomial([3])}) == len({Polynomial([3]), Rational(3)}) == 1
+        f = Polynomial([1, 1])
+        g = f
+        g += 1
+        assert f == Polynomial([1, 1]) and g == Polynomial([2, 1])
+        try:
+            f.d = 3
+            assert False
+        except AttributeError:
+            pass
+
+    def test_iterate_power(self):
+        from matrix_utils import iterate_power, iterate_power_columns, mult_matrix
+        A = [[Rational(1, 2), zero_rational, Rational(1, 2)],
+             [zero_rational, one_rational, zero_rational],
+             [Rational(1, 3), Rational(2, 3), zero_rational]]
+        A_2 = mult_matrix(A, A, add_id=zero_rational)
+        A_3 = mult_matrix(A_2, A, add_id=zero_rational)
+        cols = list(iterate_power_columns(A, columns=(0, 2), steps=3, add_id=zero_rational, mul_id=one_rational))
+        assert [col[2] for col in cols] == [[row[2] for row in B] for B in (A, A_2, A_3)]
+        v = [one_rational, zero_rational, zero_rational]
+        assert list(iterate_power(A, v, 3, add_id=zero_rational, left=True))[-1] == A_3[0]
+
+    def test_interpolation(self):
+        from interpolation import ThieleInterpolator
+        f = ThieleInterpolator()
+        for x in range(2, 7):
+            f.add(Rational(x, 1), Rational(x * x + 1, x + 3))
+        assert f(Rational(9, 1)) == Rational(82, 12)
+        assert f.to_rational_func() == RationalFunc(Polynomial([1, 0, 1]), Polynomial([3, 1]))
+        from interpolation import power_by_interpolation, power_column_by_interpolation
+        from matrix_utils import generate_transition_matrix, iterate_power, mult_matrix
+        A = generate_transition_matrix(3)
+        e = [one_REsum if i == 1 else zero_REsum for i in range(len(A))]
+        *_, col = iterate_power(A, e, 2, add_id=zero_REsum)
+        expected = [x.sum_terms() for x in col]
+        assert power_column_by_interpolation(3, 2, 1) == expected == power_column_by_interpolation(3, 2, 1, verify=3)
+        A_2 = mult_matrix(A, A, add_id=zero_REsum)
+        assert power_by_interpolation(3, 2) == [[x.sum_terms() for x in row] for row in A_2]
+        e = [one_REsum] + [zero_REsum] * 3  # the 4 states of n = 2, q = 4
+        *_, col = iterate_power(generate_transition_matrix(2, 4), e, 2, add_id=zero_REsum)
+        assert power_column_by_interpolation(2, 2, q=4) == [x.sum_terms() for x in col]
+
+    def test_modular(self):
+        from matrix_utils import generate_transition_matrix, iterate_power
+        from modular import rational_reconstruction, power_columns_modular, sum_terms_modular, mult_matrix_modular
+        m = 2 ** 31 - 1
+        assert rational_reconstruction(-3 * pow(7, -1, m) % m, m) == Rational(-3, 7)
+        A = generate_transition_matrix(3)
+        e = [one_REsum if i == 0 else zero_REsum for i in range(len(A))]
+        cols = list(iterate_power(A, e, 2, add_id=zero_REsum))
+        assert power_columns_modular(A, 2) == cols
+        assert [sum_terms_modular(x) == x.sum_terms() for x in cols[-1]] == [True] * len(A)
+        from matrix_utils import generate_poly_transition_matrix, mult_matrix
+        assert mult_matrix_modular(A, A) == mult_matrix(A, A, add_id=zero_REsum)
+        P = generate_poly_transition_matrix(3)
+        assert [list(row) for row in mult_matrix_modular(P, P)] == [list(row) for row in mult_matrix(P, P)]
+
+    def test_poly_matrix(self):
+        from matrix_utils import generate_transition_matrix, generate_poly_transition_matrix, iterate_power, mult_matrix
+        A, P = generate_transition_matrix(3), generate_poly_transition_matrix(3)
+        assert [[x.sum_terms() == f for x, f in zip(row, prow)] for row, prow in zip(A, P)] == [[True] * len(A)] * len(A)
+        A_2 = mult_matrix(P, P).to_resum()
+        for k, (u, g) in enumerate(P.iterate_column(0, 2)):
+            col = list(iterate_power(A, [one_REsum if i == 0 else zero_REsum for i in range(len(A))], k + 1, add_id=zero_REsum))[-1]
+            assert col == [RESum([RationalFunc(f, g)]) for f in u]
+        assert [row[0] for row in A_2] == col
+
+    def test_parallel_pos_above_1(self):
+        from concurrent.futures import ProcessPoolExecutor
+        from partial_ordering import check_pos_above_1
+        polys = [Polynomial([-3, 1]), Polynomial([1, 1]), zero_poly, Polynomial([Rational(1, 2), -2, 1])] * 5
+        with ProcessPoolExecutor(2) as pool:
+            assert check_pos_above_1(polys, pool, chunk_size=3) == check_pos_above_1(polys)
+
+    def test_screening(self):
+        from screening import screen
+        polys = [Polynomial([4, -4, 1]), Polynomial([1, 1]), zero_poly, Polynomial([-3, 1]), Polynomial([100, -21, 1])]
+        assert screen(polys) == [Rational(2, 1), None, None, Rational(1, 1) + Rational(1, 16), Rational(9, 1)]
+
+    def test_positivity(self):
+        import positivity
+        positivity.reset_counts()
+        assert positivity.certify([0]) == (True, 1)
+        assert positivity.certify([3, -4, 1]) == (False, 1)  # (x - 1)(x - 3) is negative just above 1
+        assert positivity.certify([-1, 0, 1]) == (True, 1)
+        assert positivity.certify([1, -2, 1]) == (True, 1)  # (x - 1)^2 only vanishes at 1
+        assert positivity.certify([5, -4, 1]) == (True, 2)  # (x - 2)^2 + 1
+        assert positivity.certify([4, -4, 1]) == (False, 2)  # (x - 2)^2
+        assert Polynomial([5, -4, 1]).pos_above_1() and not Polynomial([-5, 1]).pos_above_1()
+        assert sum(positivity.tier_counts.values()) == 2
+
+    def test_positivity_cache(self):
+        import os
+        import tempfile
+        import positivity
+        from positivity_cache import PositivityCache
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PositivityCache(os.path.join(tmp, "cache.db"))
+            polys = [[4, -4, 1], [5, -4, 1], [2, -1], [-6, 1, 1]]
+            certs = [positivity.certificate(a) for a in polys]
+            assert cache.get_many(polys) == [None] * 4
+            cache.put_many(list(zip(polys, certs)))
+            assert cache.get_many(polys) == certs and cache.get([-12, 2, 2]) == certs[3]
+            assert (cache.hits, cache.misses) == (5, 4)
+            cache.put(polys[0], (True, 2, None, [(Rational(1), Rational(2))]))  # replaces, with a bigger entry
+            totals = lambda: cache.conn.execute("SELECT size, count FROM totals").fetchone()
+            assert totals() == cache.conn.execute("SELECT SUM(size), COUNT(*) FROM certificates").fetchone()
+            cache.conn.execute("DROP TABLE totals")  # a file from before totals is counted up on opening
+            cache.close()
+            assert totals() == cache.conn.execute("SELECT SUM(size), COUNT(*) FROM certificates").fetchone()
+            cache.max_bytes = 1
+            cache.evict()
+            assert len(cache) == 0
+            cache.close()
+
+    def test_checkpoint(self):
+        import os
+        import tempfile
+        from checkpoint import Checkpoint, load_checkpoint, save_checkpoint
+        from matrix_utils import generate_poly_transition_matrix
+        A = generate_poly_transition_matrix(4)
+        cols = list(A.iterate_column(0, 3))
+        r = [[i <= j for j in range(len(A))] for i in range(len(A))]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.ckpt")
+            assert load_checkpoint(path) is None
+            save_checkpoint(path, Checkpoint(4, 1, *cols[0], r))
+            state = load_checkpoint(path)
+        assert (state.n, state.step, state.u, state.den, state.r, state.q) == (4, 1, *cols[0], r, 3)
+        assert list(A.iterate_column(steps=2, start=(state.u, state.den))) == cols[1:]
+        import contextlib, io
+        from partial_ordering import get_max_partial_ordering
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            path = os.path.join(tmp, "run.ckpt")
+            r = get_max_partial_ordering(4, steps=1, checkpoint=path, q=4)
+            assert load_checkpoint(path).q == 4 and get_max_partial_ordering(4, steps=1, checkpoint=path, q=4) == r
+            try:
+                get_max_partial_ordering(4, steps=2, checkpoint=path)
+                assert False
+            except ValueError:
+                pass
+
+    def test_serialization(self):
+        import os
+        import tempfile
+        from matrix_utils import generate_transition_matrix
+        from serialization import dumps, loads, write_matrix, MatrixReader
+        for x in [0, -5, 2 ** 70, -2 ** 200, Rational(-3, 7), Polynomial([1, -2 ** 90, Rational(1, 3)]),
+                  RationalFunc(Polynomial([1, 2]), Polynomial([3, 0, 1]))]:
+            y = loads(dumps(x))
+            assert type(y) == type(x) and y == x
+        A = generate_transition_matrix(4)
+        assert [loads(dumps(x)).a == x.a for x in A[1]] == [True] * len(A)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "A.bin")
+            write_matrix(path, A)
+            with MatrixReader(path) as R:
+                assert len(R) == len(A) and [x.a for x in R[3]] == [x.a for x in A[3]]
+                assert [[x.a for x in row] for row in R] == [[x.a for x in row] for row in A]
+        assert Polynomial([1, Rational(1, 2)]).toJSON().replace(" ", "").replace("\n", "") == '{"c":[2,1],"d":2}'
+
+    def test_sparse_matrix(self):
+        from matrix_utils import generate_transition_matrix, generate_sparse_transition_matrix, iterate_power, mult_matrix
+        A, S = generate_transition_matrix(4), generate_sparse_transition_matrix(4)
+        assert S.nnz < len(A) ** 2 and [[x.a for x in row] for row in S] == [[x.a for x in row] for row in A]
+        e = [one_REsum if i == 0 else zero_REsum for i in range(len(A))]
+        assert list(iterate_power(S, e, 2, add_id=zero_REsum)) == list(iterate_power(A, e, 2, add_id=zero_REsum))
+        assert mult_matrix(S, S).to_dense() == mult_matrix(A, A, add_id=zero_REsum)
+        D = S.to_dense()
+        D[0][len(D) - 1] += one_REsum
+        assert S[0][len(D) - 1] == zero_REsum and zero_REsum == RESum([cp(zero_rat_func)])
+
+    def test_coercion(self):
+        from expr_utils import cast_up
+        x, half = Polynomial.monomial(1), Rational(1, 2)
+        assert 1 + half == half + 1 == Rational(3, 2) and 1 - half == half and 2 * half == 1 and 1 // half == 2
+        assert half + x == x + half and 1 - x == -x + 1 and half * x == x * half == Polynomial([0, half])
+        assert cast_up(half, Polynomial) == Polynomial([half]) and cast_up(2, RESum) == RESum([RationalFunc(Polynomial([2]), one_poly)])
+        f = cast_up(one_rat_func, RationalFunc)
+        assert f is not one_rat_func and cast_up(one_rat_func, RationalFunc, read_only=True) is one_rat_func
+        assert x != "x" and x == RationalFunc(x, one_poly) and one_REsum == 1
+        try:
+            cast_up(x, Rational)
+            assert False
+        except TypeError:
+            pass
+
+    def test_backends(self):
+        import backends, poly_utils
+        from math import gcd
+        assert backends.NAME in backends.BACKENDS and backends.python_gcd(84, 36) == gcd(84, 36) == 12
+        big = 3 ** 3000 * 7
+        assert backends.gcd(big, 5 ** 2500 * 7) == 7 and Rational(big, 5 ** 2500 * 7) == Rational(3 ** 3000, 5 ** 2500)
+        a, b = [(-3) ** i for i in range(20)], [i - 7 for i in range(15)]
+        assert poly_utils.mul(a, b) == poly_utils.schoolbook_mul(a, b)
+        assert poly_utils.poly_gcd(poly_utils.mul(a, b), poly_utils.mul(a, [1, 1] * 8)) == poly_utils.subresultant_gcd(
+            poly_utils.mul(a, b), poly_utils.mul(a, [1, 1] * 8))
+
+        def missing():
+            raise ImportError("No module named 'flint'")
+        import os
+        loader, env = backends._LOADERS["flint"], os.environ.get("POTTS_BACKEND")
+        backends._LOADERS["flint"], os.environ["POTTS_BACKEND"] = missing, "flint"
+        try:
+            backends._select()
+            assert False
+        except ImportError as e:
+            assert "POTTS_BACKEND=flint" in str(e)
+        finally:
+            backends._LOADERS["flint"] = loader
+            if env is None:
+                del os.environ["POTTS_BACKEND"]
+            else:
+                os.environ["POTTS_BACKEND"] = env
+
+    def test_benchmark(self):
+        import benchmark
+        res = benchmark.run(names=["gcd", "partial_ordering_3"], repeats=2, min_time=0)
+        assert set(res["results"]) == {"gcd", "partial_ordering_3"} and res["meta"]["seed"] == benchmark.SEED
+        slow = {"results": {k: dict(v, min=v["min"] * 2) for k, v in res["results"].items()}}
+        assert benchmark.compare(res, slow) == [] and [x[0] for x in benchmark.compare(slow, res)] == list(res["results"])
+
+    def test_instrumentation(self):
+        import contextlib, io
+        import instrumentation
+        from partial_ordering import get_max_partial_ordering
+        new = Rational.__new__
+        with instrumentation.instrumented() as report, contextlib.redirect_stdout(io.StringIO()):
+            Polynomial.monomial(3) * Polynomial.monomial(2) // Polynomial.monomial(1)
+            get_max_partial_ordering(4)
+            res = report()
+        assert not instrumentation.enabled and Rational.__new__ is new and Rational(2, 4) == Rational(1, 2)
+        assert res["counts"]["poly_mul"] > 0 and res["counts"]["rational_new"] > 0 and "4" in res["histograms"]["poly_mul_degree"]
+        assert {"matrix_power", "differences", "pos_above_1"} <= set(res["phases"])
+        with instrumentation.instrumented() as report, contextlib.redirect_stdout(io.StringIO()):
+            Polynomial([1, 0, 1]) // Polynomial([1, 1])  # inexact, so // falls back on divmod
+            assert report()["counts"]["poly_floordiv"] == 1 and "poly_divmod" not in report()["counts"]
+            instrumentation.reset()
+            get_max_partial_ordering(4, modular=True)
+            res = report()
+        assert {"matrix_power", "differences", "pos_above_1"} <= set(res["phases"])
+        assert res["counts"]["gcd"] > 0 and res["counts"]["poly_mul"] > 0 and res["histograms"]["poly_mul_degree"]
+
+    def test_stationary(self):
+        from matrix_utils import generate_transition_matrix, evaluate_matrix_at_rational
+        from stationary import stationary_distribution
+        pi = stationary_distribution(4)
+        assert [(f.f, f.g) for f in pi] == [(f.f, f.g) for f in stationary_distribution(4, interpolate=True)]
+        lambd = Rational(7, 3)
+        A, x = evaluate_matrix_at_rational(generate_transition_matrix(4), lambd), [f(lambd) for f in pi]
+        assert sum(x, zero_rational) == one_rational and all(f.g.c[-1] == f.g.d for f in pi)
+        assert all(sum((x[i] * A[i][j] for i in range(len(A))), zero_rational) == x[j] for j in range(len(A)))
+
+    def test_sweep(self):
+        import numpy as np
+        from matrix_utils import generate_transition_matrix, evaluate_matrix_at_rational
+        from partial_ordering import get_max_partial_ordering
+        from sweep import transition_tensor, matrix_powers, distributions, spectral_gap, sweep_partial_ordering
+        P = transition_tensor(4, [0.5, 3.0, 1e3])
+        exact = evaluate_matrix_at_rational(generate_transition_matrix(4), Rational(3))
+        assert np.allclose(P[1], [[x.p / x.q for x in row] for row in exact]) and np.allclose(P.sum(axis=2), 1)
+        assert np.allclose(distributions(P, 5)[-1], matrix_powers(P, 5)[:, 0]) and (spectral_gap(P) > 0).all()
+        import contextlib, io
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = get_max_partial_ordering(4)
+        assert sweep_partial_ordering(4, np.geomspace(1.001, 1e3, 500)) == r
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = get_max_partial_ordering(5, q=4)
+        assert sweep_partial_ordering(5, np.geomspace(1.001, 1e3, 500), q=4) == r
+
+    def test_state_space(self):
+        from matrix_utils import generate_sparse_transition_matrix, evaluate_matrix_at_rational
+        from states import StateSpace, get_states
+        assert get_states(4) == [(4, 0, 0), (3, 1, 0), (2, 2, 0), (2, 1, 1), (1, 3, 0), (1, 2, 1), (0, 4, 0), (0, 3, 1), (0, 2, 2)]
+        for q in 2, 4, 5:
+            S = StateSpace(6, q)
+            states = list(S)
+            assert len(S) == len(set(states)) and states == sorted(states, reverse=True)
+            assert all(S.rank(x) == i and S[i] == x and sum(x) == 6 and len(x) == q for i, x in enumerate(states))
+        A = evaluate_matrix_at_rational(generate_sparse_transition_matrix(5, 4), Rational(3))
+        assert all(sum(row, zero_rational) == one_rational for row in A)